@@ -1,65 +1,173 @@
 import argparse
 import json
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict, Optional, Tuple
 
-from .data_processing.calculate_meals_count import calculate_meals_count_from_file
+from .data_processing.calculate_debit_attendance import ATTENDANCE_TYPES, DEBIT_REDUCER
+from .data_processing.calculate_meals_count import meals_reducer
+from .data_processing.calculate_overtime import OVERTIME_REDUCER, _calculate_total_overtime
 from .data_processing.calculate_overtime_pay_remaining_debit import (
-    calculate_overtime_pay_and_remaining_debit_from_file,
+    _calculate_overtime_pay_and_remaining_debit,
 )
 from .data_processing.calculate_valid_invalid_working_days import (
-    calculate_valid_invalid_working_days_from_file,
+    first_attendance_month,
+    working_days_reducer,
 )
-from src.utils import OUTPUT_FOLDER
+from src.excel_writer import SUMMARY_SHEET, breakdown_sheets, summary_sheet, write_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, combine_branches, filter_by_type, generate_filtered_report
+from src.geofence import SITES_CONFIG, SiteIndex, load_site_index
+from src.reducer_pipeline import MAX_CALCULATOR_WORKERS, run_reducers
+from src.summary import build_summary
+from src.utils import ALL_TYPES, OUTPUT_FOLDER
 
 
-def _collect_employee_names(*maps: Dict[str, object]) -> Set[str]:
-    employees: Set[str] = set()
-    for mapping in maps:
-        employees.update(mapping.keys())
-    return employees
+def _calculate_all(
+    mapping,
+    detail: bool = False,
+    executor: Optional[Executor] = None,
+    site_index: Optional[SiteIndex] = None,
+    shards: int = MAX_CALCULATOR_WORKERS,
+) -> Tuple[Dict[str, Dict[str, float]], Optional[Dict[str, dict]]]:
+    """Summarize one already-ingested report holding every record type.
 
+    Every calculator is a reducer plugin fed by a single time-sorted sweep
+    over each employee's records, and overtime pay is joined afterwards.
+    With an ``executor`` the employees are split into ``shards`` reduced
+    concurrently on it. With ``site_index``, out-of-fence scans count as
+    invalid working days.
 
-def calculate_all_from_file(input_path: str, start_date = None) -> str:
-    overtime_payload = json.loads(
-        calculate_overtime_pay_and_remaining_debit_from_file(input_path, start_date)
-    )
-    working_days_payload = json.loads(
-        calculate_valid_invalid_working_days_from_file(input_path, start_date)
+    Returns the per-employee summary and, with ``detail``, the breakdowns it
+    was derived from; otherwise no breakdown is built and None is returned.
+    """
+    reducers = {"debit": DEBIT_REDUCER, "overtime": OVERTIME_REDUCER, "meals": meals_reducer(detail)}
+    month = first_attendance_month(filter_by_type(mapping, ATTENDANCE_TYPES))
+    if month is not None:
+        reducers["working_days"] = working_days_reducer(month, detail, site_index)
+    results = run_reducers(mapping, reducers, executor, shards)
+
+    debit_summary = {employee: total for employee, (total, _) in results["debit"].items()}
+    overtime_durations = results["overtime"]
+    overtime_to_be_paid, remaining_debit = _calculate_overtime_pay_and_remaining_debit(
+        debit_summary, _calculate_total_overtime(overtime_durations)
     )
-    meals_payload = json.loads(calculate_meals_count_from_file(input_path, start_date))
-
-    overtime_to_be_paid = overtime_payload.get("overtime_to_be_paid_in_rupiah", {})
-    remaining_debit = overtime_payload.get("remaining_debit_hours", {})
-    valid_working_days = working_days_payload.get("valid_working_days", {})
-    invalid_working_days = working_days_payload.get("invalid_working_days", {})
-    meals_count = meals_payload.get("total_meal_count", {})
-
-    employees = _collect_employee_names(
-        overtime_to_be_paid,
-        remaining_debit,
-        valid_working_days,
-        invalid_working_days,
-        meals_count,
+
+    if month is None:
+        print("WARNING: No attendance records found in the input file, can't calculate valid/invalid working days.")
+    working_days = results.get("working_days", {})
+    valid_working_days = {employee: days[0] for employee, days in working_days.items()}
+    invalid_working_days = {employee: days[1] for employee, days in working_days.items()}
+
+    meals = results["meals"]
+    meals_count = {employee: count for employee, (count, _, _) in meals.items()}
+
+    summary = build_summary(
+        overtime_to_be_paid, remaining_debit, valid_working_days, invalid_working_days, meals_count
     )
+    if not detail:
+        return summary, None
+
+    breakdowns = {
+        "employee_debit_breakdown": {employee: breakdown for employee, (_, breakdown) in results["debit"].items()},
+        "overtime_sessions": overtime_durations,
+        "valid_days_breakdown": {employee: days[2] for employee, days in working_days.items() if days[2]},
+        "invalid_days_breakdown": {employee: days[3] for employee, days in working_days.items() if days[3]},
+        "meal_hours_breakdown": {employee: sessions for employee, (_, sessions, _) in meals.items()},
+    }
+    return summary, breakdowns
+
+
+def _calculator_pool(workers: int):
+    """Return a process pool of ``workers`` to reduce employees on, or a no-op context yielding None."""
+    if workers > 1:
+        return ProcessPoolExecutor(max_workers=workers)
+    return nullcontext()
+
 
-    summary: Dict[str, Dict[str, float]] = {}
-    for employee in sorted(employees):
-        summary[employee] = {
-            "valid_working_days": float(valid_working_days.get(employee, 0.0) or 0.0),
-            "invalid_working_days": float(
-                invalid_working_days.get(employee, 0.0) or 0.0
-            ),
-            "overtime_to_be_paid_in_rupiah": float(
-                overtime_to_be_paid.get(employee, 0.0) or 0.0
-            ),
-            "remaining_debit_hours": float(
-                remaining_debit.get(employee, 0.0) or 0.0
-            ),
-            "meals_count": int(meals_count.get(employee, 0) or 0),
+def calculate_all_from_file(
+    input_path: str,
+    start_date = None,
+    by_branch: bool = False,
+    detail: bool = False,
+    sites_path: Optional[str] = None,
+    workers: int = 0,
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+) -> str:
+    """Return the per-employee summary, read from a single pass over the export.
+
+    With ``by_branch`` the payload holds the combined summary alongside one
+    summary per branch sheet. With ``detail`` the payload holds the summary
+    under "summary" next to every breakdown of the combined report. With
+    ``sites_path`` scans are validated against the site geofences. With
+    ``workers`` above 1 employees are reduced on that many processes.
+    ``dedup_window_seconds`` is passed on to ``generate_filtered_report``.
+    """
+    site_index = load_site_index(sites_path) if sites_path else None
+    include_location = site_index is not None
+    if not by_branch:
+        mapping = generate_filtered_report(
+            input_path, ALL_TYPES, start_date, dedup_window_seconds, include_location=include_location
+        )
+        with _calculator_pool(workers) as executor:
+            summary, breakdowns = _calculate_all(mapping, detail, executor, site_index, workers)
+        if not detail:
+            return json.dumps(summary, ensure_ascii=False, indent=2)
+        return json.dumps({"summary": summary, **breakdowns}, ensure_ascii=False, indent=2)
+
+    branches = generate_filtered_report(
+        input_path, ALL_TYPES, start_date, dedup_window_seconds, by_branch=True, include_location=include_location
+    )
+    with _calculator_pool(workers) as executor:
+        combined, breakdowns = _calculate_all(combine_branches(branches), detail, executor, site_index, workers)
+        payload = {
+            "combined": combined,
+            "branches": {
+                branch: _calculate_all(mapping, False, executor, site_index, workers)[0]
+                for branch, mapping in branches.items()
+            },
         }
+    if detail:
+        payload.update(breakdowns)
+    return json.dumps(payload, ensure_ascii=False, indent=2)
+
+
+def calculate_all_to_workbook(
+    input_path: str,
+    output_path,
+    start_date = None,
+    by_branch: bool = False,
+    sites_path: Optional[str] = None,
+    workers: int = 0,
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+) -> None:
+    """Stream the summary and every breakdown into an .xlsx workbook.
+
+    With ``by_branch`` one extra summary sheet is written per branch sheet.
+    """
+    site_index = load_site_index(sites_path) if sites_path else None
+    branches = generate_filtered_report(
+        input_path,
+        ALL_TYPES,
+        start_date,
+        dedup_window_seconds,
+        by_branch=True,
+        include_location=site_index is not None,
+    )
+    with _calculator_pool(workers) as executor:
+        summary, breakdowns = _calculate_all(combine_branches(branches), True, executor, site_index, workers)
 
-    return json.dumps(summary, ensure_ascii=False, indent=2)
+        sheets = [summary_sheet(summary)]
+        if by_branch:
+            sheets.extend(
+                summary_sheet(
+                    _calculate_all(mapping, False, executor, site_index, workers)[0],
+                    title=f"{SUMMARY_SHEET} {branch}",
+                )
+                for branch, mapping in branches.items()
+            )
+    sheets.extend(breakdown_sheets(breakdowns))
+    write_workbook(output_path, sheets)
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -72,7 +180,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export.",
+        help="Path to the XLS or CSV/TSV export.",
     )
     parser.add_argument(
         "--date",
@@ -85,10 +193,52 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--by-branch",
+        action="store_true",
+        help="Also summarize every branch sheet of the workbook separately.",
+    )
+    parser.add_argument(
+        "--detail",
+        action="store_true",
+        help="Include every breakdown in the JSON output next to the summary.",
+    )
+    parser.add_argument(
+        "--sites",
+        default=None,
+        help=f"Site geofence config (e.g. {SITES_CONFIG}); scans outside every site count as invalid.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes a summary sheet plus one sheet per breakdown.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Reduce employees on this many worker processes; off by default, only worth it for large exports on several CPUs.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    payload = calculate_all_from_file(args.input, args.date)
     output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        calculate_all_to_workbook(
+            args.input, output_path, args.date, args.by_branch, args.sites, args.workers, args.dedup_window
+        )
+        return
+
+    payload = calculate_all_from_file(
+        args.input, args.date, args.by_branch, args.detail, args.sites, args.workers, args.dedup_window
+    )
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
         handle.write(payload)
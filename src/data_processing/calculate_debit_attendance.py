@@ -3,13 +3,16 @@
 
 import argparse
 import json
-from collections import defaultdict
+from bisect import bisect_right
 from datetime import datetime, time
+from functools import partial
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Sequence, Tuple
 
-from src.filter_report import generate_filtered_report
-from src.utils import OUTPUT_FOLDER, parse_datetime, ABSENSI_MASUK, ABSENSI_PULANG, A_IN, A_OUT, MULAI_KERJA_DI_RUMAH, SELESAI_KERJA_DI_RUMAH
+from src.excel_writer import write_payload_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
+from src.reducer_pipeline import Reducer, run_reducers
+from src.utils import OUTPUT_FOLDER, ABSENSI_MASUK, ABSENSI_PULANG, A_IN, A_OUT, MULAI_KERJA_DI_RUMAH, SELESAI_KERJA_DI_RUMAH
 
 TIME_WINDOW = (time(8, 0), time(17, 0))
 LATE_GRACE_PERIOD = 16 / 60.0  # hours
@@ -19,47 +22,77 @@ CHECK_IN_TYPES = {ABSENSI_MASUK, A_IN, MULAI_KERJA_DI_RUMAH}
 CHECK_OUT_TYPES = {ABSENSI_PULANG, A_OUT, SELESAI_KERJA_DI_RUMAH}
 
 
-def _calculate_debit(data) -> Dict[str, float]:
-    debit_summary: Dict[str, float] = {}
-    employee_to_debit_breakdown: Dict[str, Dict[str, float]] = {}
-
-    for employee, records in data.items():
-        debit_total = 0.0  # hours
-        debit_calculation: Dict[str, float] = defaultdict(int)
-
-        for record in records:
-            if len(record) < 2:
-                raise ValueError(f"Invalid record for {employee}: {record}")
-            attendance_type, recorded_time = record[0], record[1]
-
-            parsed = parse_datetime(str(recorded_time))
-            if not parsed:
-                raise ValueError(f"Cannot parse datetime: {recorded_time}")
-
-            target_start_dt = datetime.combine(parsed.date(), TIME_WINDOW[0])
-            target_end_dt = datetime.combine(parsed.date(), TIME_WINDOW[1])
-
-            delta_start_hours = (parsed - target_start_dt).total_seconds() / 3600.0
-            delta_end_hours = (parsed - target_end_dt).total_seconds() / 3600.0
-
-            date = parsed.date().isoformat()
-            if attendance_type in CHECK_IN_TYPES and LATE_GRACE_PERIOD <= delta_start_hours:
-                debit_total += delta_start_hours
-                debit_calculation[date] += delta_start_hours
-            elif attendance_type in CHECK_OUT_TYPES and delta_end_hours < 0:
-                debit_total += -delta_end_hours
-                debit_calculation[date] += -delta_end_hours
-
-        debit_summary[employee] = debit_total
-        employee_to_debit_breakdown[employee] = debit_calculation
-
-    return debit_summary, employee_to_debit_breakdown
+def _debit_init(grace_count: int = 1) -> List[float]:
+    # Late check-in hours bucketed by how many grace periods they reach, then early check-out hours.
+    return [0.0] * (grace_count + 1)
+
+def _debit_update(
+    state: List[float], record, parsed: datetime, late_grace_periods: Sequence[float] = (LATE_GRACE_PERIOD,)
+) -> None:
+    """Add late check-in hours once, under the largest of the ascending ``late_grace_periods`` they reach, and early check-out hours."""
+    attendance_type = record[0]
+    if attendance_type in CHECK_IN_TYPES:
+        delta_start_hours = (parsed - datetime.combine(parsed.date(), TIME_WINDOW[0])).total_seconds() / 3600.0
+        reached = bisect_right(late_grace_periods, delta_start_hours)
+        if reached:
+            state[reached - 1] += delta_start_hours
+    elif attendance_type in CHECK_OUT_TYPES:
+        delta_end_hours = (parsed - datetime.combine(parsed.date(), TIME_WINDOW[1])).total_seconds() / 3600.0
+        if delta_end_hours < 0:
+            state[-1] += -delta_end_hours
+
+def _debit_finalize(state: List[float], day) -> List[float]:
+    """Return the day's debit hours under each grace period: a grace period counts every late check-in that reached it."""
+    hours: List[float] = []
+    running = state[-1]
+    for late_hours in reversed(state[:-1]):
+        running += late_hours
+        hours.append(running)
+    return hours[::-1]
+
+def _debit_combine(days) -> Tuple[float, Dict[str, float]]:
+    """Return the employee's debit hours and the dates that contributed to it."""
+    breakdown = {day.isoformat(): hours[0] for day, hours in days if hours[0]}
+    return sum(hours[0] for _, hours in days), breakdown
+
+def _debit_sweep_combine(days, grace_count: int) -> List[float]:
+    """Return the employee's debit hours under each grace period."""
+    totals = [0.0] * grace_count
+    for _, hours in days:
+        for index, day_hours in enumerate(hours):
+            totals[index] += day_hours
+    return totals
+
+DEBIT_REDUCER = Reducer(ATTENDANCE_TYPES, _debit_init, _debit_update, _debit_finalize, _debit_combine)
+
+def debit_sweep_reducer(late_grace_periods: Sequence[float]) -> Reducer:
+    """Return a debit plugin totalling every grace period of the ascending, distinct ``late_grace_periods`` in one pass."""
+    grace_periods = tuple(late_grace_periods)
+    return Reducer(
+        ATTENDANCE_TYPES,
+        partial(_debit_init, len(grace_periods)),
+        partial(_debit_update, late_grace_periods=grace_periods),
+        _debit_finalize,
+        partial(_debit_sweep_combine, grace_count=len(grace_periods)),
+    )
 
-def calculate_debit_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None) -> str:
-    mapping = generate_filtered_report(input_file, ATTENDANCE_TYPES, start_date)
-    payload = json.dumps(mapping, ensure_ascii=False, indent=2)
-    statistics, breakdown = _calculate_debit(json.loads(payload))
-    return json.dumps({"debit_summary": statistics, "employee_debit_breakdown": breakdown}, ensure_ascii=False, indent=2)
+def _calculate_debit(data, detail: bool = True) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
+    """Return debit hours per employee and, with ``detail``, per employee and date."""
+    results = run_reducers(data, {"debit": DEBIT_REDUCER})["debit"]
+    debit_summary = {employee: total for employee, (total, _) in results.items()}
+    if not detail:
+        return debit_summary, {}
+    return debit_summary, {employee: breakdown for employee, (_, breakdown) in results.items()}
+
+def _debit_payload(input_file: str, start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> Dict[str, dict]:
+    mapping = generate_filtered_report(input_file, ATTENDANCE_TYPES, start_date, dedup_window_seconds)
+    statistics, breakdown = _calculate_debit(mapping, detail)
+    if not detail:
+        return {"debit_summary": statistics}
+    return {"debit_summary": statistics, "employee_debit_breakdown": breakdown}
+
+def calculate_debit_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> str:
+    return json.dumps(_debit_payload(input_file, start_date, detail, dedup_window_seconds), ensure_ascii=False, indent=2)
     
 
 def main() -> None:
@@ -70,7 +103,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export.",
+        help="Path to the XLS or CSV/TSV export.",
     )
     parser.add_argument(
         "--date",
@@ -83,13 +116,35 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Only compute the per-employee totals and skip the breakdowns.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes a summary sheet plus one sheet per breakdown.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    output = calculate_debit_from_file(args.input, args.date)
+    payload = _debit_payload(args.input, args.date, not args.summary_only, args.dedup_window)
     output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        write_payload_workbook(output_path, payload)
+        return
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
-        handle.write(output)
+        handle.write(json.dumps(payload, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":
     main()
@@ -2,13 +2,15 @@ import argparse
 import json
 from pathlib import Path
 from datetime import date, datetime, time
-from typing import Dict, List, Tuple, Union, Set
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union, Set
 
-from src.filter_report import generate_filtered_report
+from src.excel_writer import write_payload_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
+from src.reducer_pipeline import Reducer, run_reducers
 from src.utils import (
     OUTPUT_FOLDER,
     format_datetime,
-    parse_datetime,
     MULAI_ISTIRAHAT,
     SELESAI_ISTIRAHAT,
     C_IN,
@@ -23,121 +25,156 @@ LUNCH = "Lunch"
 DINNER = "Dinner"
 
 
-def calculate_meals_count_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None) -> str:
-    filtered_records = generate_filtered_report(input_file, MEAL_TYPES, start_date)
-    meal_hours_breakdown: Dict[str, List[Dict[str, Union[float, bool]]]] = {}
-    total_meal_count: Dict[str, int] = {}
-    
-    for employee, records in filtered_records.items():
-        entitled_meals_count = 0
-        parsed_dates: List[datetime] = []
-        meal_sessions: List[Dict[str, Union[float, bool]]] = []
-        entitled_meals_by_date: Dict[date, Set[str]] = {}
-        latest_c_in_by_date: Dict[date, datetime] = {}
-        earliest_c_out_by_date: Dict[date, datetime] = {}
-        latest_lunch_break_end_by_date: Dict[date, datetime] = {}
-        earliest_lunch_break_start_by_date: Dict[date, datetime] = {}
-
-        for record in records:
-            if len(record) < 2:
-                continue
-
-            meal_type, recorded_time = record[0], record[1]
-            if meal_type not in MEAL_TYPES:
-                continue
-
-            parsed = parse_datetime(str(recorded_time))
-            if not parsed:
-                continue
-
-            date_key = parsed.date()
-            parsed_dates.append(date_key)
-            if meal_type == C_IN and date_key not in latest_c_in_by_date:
-                latest_c_in_by_date[date_key] = parsed
-            elif meal_type == C_OUT:
-                earliest_c_out_by_date[date_key] = parsed
-            elif meal_type == MULAI_ISTIRAHAT:
-                earliest_lunch_break_start_by_date[date_key] = parsed
-            elif meal_type == SELESAI_ISTIRAHAT and date_key not in latest_lunch_break_end_by_date:
-                latest_lunch_break_end_by_date[date_key] = parsed
-
-        for date_key in parsed_dates:
-            latest_c_in = latest_c_in_by_date.get(date_key)
-            is_eligible_breakfast = (
-                latest_c_in is not None
-                and latest_c_in < datetime.combine(date_key, C_IN_LATEST)
-            )
-            is_entitled_breakfast = False
-            if is_eligible_breakfast and BREAKFAST not in entitled_meals_by_date.get(date_key, set()):
-                is_entitled_breakfast = True
-                entitled_meals_count += 1
-                entitled_meals_by_date.setdefault(date_key, set()).add(BREAKFAST)
-            meal_sessions.append(
-                {
-                    "meal_type": BREAKFAST,
-                    "check_in_time": format_datetime(latest_c_in) if latest_c_in else None,
-                    "is_eligible": is_eligible_breakfast,
-                    "is_entitled": is_entitled_breakfast
-                }
-            )
-
-            earliest_c_out = earliest_c_out_by_date.get(date_key)
-            is_eligible_dinner = (
-                earliest_c_out is not None
-                and earliest_c_out >= datetime.combine(date_key, C_OUT_EARLIEST)
-            )
-            is_entitled_dinner = False
-            if is_eligible_dinner and DINNER not in entitled_meals_by_date.get(date_key, set()):
-                is_entitled_dinner = True
-                entitled_meals_count += 1
-                entitled_meals_by_date.setdefault(date_key, set()).add(DINNER)
+def _evaluate_meal_date(
+    date_key: date,
+    latest_c_in: Optional[datetime],
+    earliest_c_out: Optional[datetime],
+    beginning_lunch_break: Optional[datetime],
+    end_lunch_break: Optional[datetime],
+    entitled_meals_by_date: Dict[date, Set[str]],
+    meal_sessions: List[Dict[str, Union[float, bool]]],
+    detail: bool,
+) -> int:
+    """Entitle the meals earned on ``date_key`` and return how many were newly entitled."""
+    added = 0
+    is_eligible_breakfast = (
+        latest_c_in is not None
+        and latest_c_in < datetime.combine(date_key, C_IN_LATEST)
+    )
+    is_entitled_breakfast = False
+    if is_eligible_breakfast and BREAKFAST not in entitled_meals_by_date.get(date_key, set()):
+        is_entitled_breakfast = True
+        added += 1
+        entitled_meals_by_date.setdefault(date_key, set()).add(BREAKFAST)
+    if detail:
+        meal_sessions.append(
+            {
+                "meal_type": BREAKFAST,
+                "check_in_time": format_datetime(latest_c_in) if latest_c_in else None,
+                "is_eligible": is_eligible_breakfast,
+                "is_entitled": is_entitled_breakfast
+            }
+        )
+
+    is_eligible_dinner = (
+        earliest_c_out is not None
+        and earliest_c_out >= datetime.combine(date_key, C_OUT_EARLIEST)
+    )
+    is_entitled_dinner = False
+    if is_eligible_dinner and DINNER not in entitled_meals_by_date.get(date_key, set()):
+        is_entitled_dinner = True
+        added += 1
+        entitled_meals_by_date.setdefault(date_key, set()).add(DINNER)
+    if detail:
+        meal_sessions.append(
+            {
+                "meal_type": DINNER,
+                "check_out_time": format_datetime(earliest_c_out) if earliest_c_out else None,
+                "is_eligible": is_eligible_dinner,
+                "is_entitled": is_entitled_dinner
+            }
+        )
+
+    if end_lunch_break is None or beginning_lunch_break is None:
+        return added
+    is_c_in_out_in_order = (
+        latest_c_in is not None
+        and earliest_c_out is not None
+        and latest_c_in < beginning_lunch_break
+        and end_lunch_break < earliest_c_out
+    )
+    lunch_duration = (end_lunch_break - beginning_lunch_break).total_seconds() / 3600.0
+    is_eligible_lunch = lunch_duration < (1.0 + 60/3600) and is_c_in_out_in_order
+    is_entitled_lunch = False
+    if is_eligible_lunch and LUNCH not in entitled_meals_by_date.get(date_key, set()):
+        is_entitled_lunch = True
+        added += 1
+        entitled_meals_by_date.setdefault(date_key, set()).add(LUNCH)
+        if detail:
             meal_sessions.append(
                 {
-                    "meal_type": DINNER,
-                    "check_out_time": format_datetime(earliest_c_out) if earliest_c_out else None,
-                    "is_eligible": is_eligible_dinner,
-                    "is_entitled": is_entitled_dinner
+                    "meal_type": LUNCH,
+                    "mulai": format_datetime(beginning_lunch_break),
+                    "selesai": format_datetime(end_lunch_break),
+                    "duration": lunch_duration,
+                    "is_eligible": is_eligible_lunch,
+                    "is_entitled": is_entitled_lunch
                 }
             )
-
-            end_lunch_break = latest_lunch_break_end_by_date.get(date_key)
-            beginning_lunch_break = earliest_lunch_break_start_by_date.get(date_key)
-            if end_lunch_break is None or beginning_lunch_break is None:
-                continue
-            is_c_in_out_in_order = (
-                latest_c_in is not None
-                and earliest_c_out is not None
-                and latest_c_in < beginning_lunch_break
-                and end_lunch_break < earliest_c_out
-            )
-            lunch_duration = (end_lunch_break - beginning_lunch_break).total_seconds() / 3600.0
-            is_eligible_lunch = lunch_duration < (1.0 + 60/3600) and is_c_in_out_in_order
-            is_entitled_lunch = False
-            if is_eligible_lunch and LUNCH not in entitled_meals_by_date.get(date_key, set()):
-                is_entitled_lunch = True
-                entitled_meals_count += 1
-                entitled_meals_by_date.setdefault(date_key, set()).add(LUNCH)
-                meal_sessions.append(
-                    {
-                        "meal_type": LUNCH,
-                        "mulai": format_datetime(beginning_lunch_break),
-                        "selesai": format_datetime(end_lunch_break),
-                        "duration": lunch_duration,
-                        "is_eligible": is_eligible_lunch,
-                        "is_entitled": is_entitled_lunch
-                    }
-                )
-        
-        meal_hours_breakdown[employee] = meal_sessions
-        total_meal_count[employee] = entitled_meals_count
-
-    return json.dumps({
-            "total_meal_count": total_meal_count,
-            "meal_hours_breakdown": meal_hours_breakdown,
-        }, 
-        ensure_ascii=False, 
-        indent=2
-    )
+    return added
+
+def _meals_init() -> Dict[str, object]:
+    return {"c_in": None, "c_out": None, "lunch_start": None, "lunch_end": None, "scans": 0}
+
+def _meals_update(state: Dict[str, object], record, parsed: datetime) -> None:
+    """Keep the latest C IN, earliest C OUT, earliest break start and latest break end of the day."""
+    meal_type = record[0]
+    if meal_type == C_IN and (state["c_in"] is None or parsed > state["c_in"]):
+        state["c_in"] = parsed
+    elif meal_type == C_OUT and (state["c_out"] is None or parsed < state["c_out"]):
+        state["c_out"] = parsed
+    elif meal_type == MULAI_ISTIRAHAT and (state["lunch_start"] is None or parsed < state["lunch_start"]):
+        state["lunch_start"] = parsed
+    elif meal_type == SELESAI_ISTIRAHAT and (state["lunch_end"] is None or parsed > state["lunch_end"]):
+        state["lunch_end"] = parsed
+    state["scans"] += 1
+
+def _meals_finalize(state: Dict[str, object], day: date, detail: bool) -> Tuple[Set[str], List[Dict[str, Union[float, bool]]]]:
+    entitled_meals_by_date: Dict[date, Set[str]] = {}
+    meal_sessions: List[Dict[str, Union[float, bool]]] = []
+    # The breakdown lists the day's meals once per scan of the day.
+    for _ in range(state["scans"] if detail else 1):
+        _evaluate_meal_date(
+            day,
+            state["c_in"],
+            state["c_out"],
+            state["lunch_start"],
+            state["lunch_end"],
+            entitled_meals_by_date,
+            meal_sessions,
+            detail,
+        )
+    return entitled_meals_by_date.get(day, set()), meal_sessions
+
+def _meals_combine(days) -> Tuple[int, List[Dict[str, Union[float, bool]]], Dict[date, Set[str]]]:
+    """Return the employee's entitled meal count, meal sessions and entitled meals per date."""
+    meal_sessions: List[Dict[str, Union[float, bool]]] = []
+    for _, (_, sessions) in days:
+        meal_sessions.extend(sessions)
+    entitled_meals_by_date = {day: meals for day, (meals, _) in days if meals}
+    return sum(len(meals) for meals in entitled_meals_by_date.values()), meal_sessions, entitled_meals_by_date
+
+def meals_reducer(detail: bool = False) -> Reducer:
+    return Reducer(MEAL_TYPES, _meals_init, _meals_update, partial(_meals_finalize, detail=detail), _meals_combine)
+
+def _calculate_meals_count(
+    filtered_records,
+    detail: bool = True,
+) -> Tuple[Dict[str, int], Dict[str, List[Dict[str, Union[float, bool]]]], Dict[str, Dict[date, Set[str]]]]:
+    """Return total entitled meals, meal sessions and entitled meals per date for each employee.
+
+    Without ``detail`` the meal sessions are not built and each date is evaluated once.
+    """
+    results = run_reducers(filtered_records, {"meals": meals_reducer(detail)})["meals"]
+    total_meal_count = {employee: count for employee, (count, _, _) in results.items()}
+    entitled_meals = {employee: by_date for employee, (_, _, by_date) in results.items()}
+    if not detail:
+        return total_meal_count, {}, entitled_meals
+    return total_meal_count, {employee: sessions for employee, (_, sessions, _) in results.items()}, entitled_meals
+
+def _meals_payload(input_file: str, start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> Dict[str, dict]:
+    filtered_records = generate_filtered_report(input_file, MEAL_TYPES, start_date, dedup_window_seconds)
+    total_meal_count, meal_hours_breakdown, _ = _calculate_meals_count(filtered_records, detail)
+    if not detail:
+        return {"total_meal_count": total_meal_count}
+
+    return {
+        "total_meal_count": total_meal_count,
+        "meal_hours_breakdown": meal_hours_breakdown,
+    }
+
+def calculate_meals_count_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> str:
+    return json.dumps(_meals_payload(input_file, start_date, detail, dedup_window_seconds), ensure_ascii=False, indent=2)
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -147,7 +184,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export.",
+        help="Path to the XLS or CSV/TSV export.",
     )
     parser.add_argument(
         "--date",
@@ -160,13 +197,35 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Only compute the per-employee totals and skip the breakdowns.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes a summary sheet plus one sheet per breakdown.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    meal_calculation = calculate_meals_count_from_file(args.input, args.date)
+    meal_calculation = _meals_payload(args.input, args.date, not args.summary_only, args.dedup_window)
     output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        write_payload_workbook(output_path, meal_calculation)
+        return
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
-        handle.write(meal_calculation)
+        handle.write(json.dumps(meal_calculation, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":
     main()
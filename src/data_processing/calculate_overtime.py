@@ -7,58 +7,70 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union
 
-from src.filter_report import generate_filtered_report
-from src.utils import MULAI_LEMBUR, SELESAI_LEMBUR, OUTPUT_FOLDER, parse_datetime
+from src.excel_writer import write_payload_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
+from src.reducer_pipeline import Reducer, run_reducers
+from src.utils import MULAI_LEMBUR, SELESAI_LEMBUR, OUTPUT_FOLDER
 
 OVERTIME_TYPES = {MULAI_LEMBUR, SELESAI_LEMBUR}
 
 
-def _calculate_overtime_durations(
-    records: Dict[str, List[List[str]]]
-) -> Dict[str, List[Dict[str, float]]]:
-    """Compute per-session overtime durations for each employee.
+def _overtime_session(start: Tuple[datetime, str], end: Tuple[datetime, str]) -> Dict[str, Union[float, bool]]:
+    start_dt, start_time = start
+    end_dt, end_time = end
+    return {
+        "mulai": start_time,
+        "selesai": end_time,
+        "hours": max((end_dt - start_dt).total_seconds() / 3600.0, 8.0),
+        "isValid": start_dt.date() == end_dt.date(),
+    }
+
+
+def _overtime_init() -> Dict[str, object]:
+    return {"leading_end": None, "start": None, "sessions": [], "seen": False}
 
-    Assumes entries are ordered: Selesai Lembur, Mulai Lembur, Selesai Lembur, ...
+
+def _overtime_update(state: Dict[str, object], record, parsed: datetime) -> None:
+    """Pair, in time order, the latest Mulai Lembur with the first Selesai Lembur after it.
+
+    A Selesai opening the day is kept aside so it can close a session left
+    open on an earlier day.
     """
-    summary: Dict[str, List[Dict[str, Union[float, bool]]]] = {}
+    attendance_type, recorded_time = record[0], record[1]
+    if attendance_type == MULAI_LEMBUR:
+        state["start"] = (parsed, recorded_time)
+    elif attendance_type == SELESAI_LEMBUR:
+        if state["start"] is not None:
+            state["sessions"].append(_overtime_session(state["start"], (parsed, recorded_time)))
+            state["start"] = None
+        elif not state["seen"]:
+            state["leading_end"] = (parsed, recorded_time)
+    state["seen"] = True
 
-    for employee, entries in records.items():
-        sessions: List[Dict[str, Union[float, bool]]] = []
-        last_end: Optional[Tuple[datetime, str]] = None
 
-        for record in entries:
-            if len(record) < 2:
-                continue
+def _overtime_finalize(state: Dict[str, object], day) -> Dict[str, object]:
+    return state
 
-            attendance_type, recorded_time = record[0], record[1]
-            if attendance_type not in OVERTIME_TYPES:
-                continue
 
-            parsed = parse_datetime(str(recorded_time))
-            if not parsed:
-                continue
+def _overtime_combine(days) -> List[Dict[str, Union[float, bool]]]:
+    sessions: List[Dict[str, Union[float, bool]]] = []
+    open_start: Optional[Tuple[datetime, str]] = None
+    for _, state in days:
+        if state["leading_end"] is not None and open_start is not None:
+            sessions.append(_overtime_session(open_start, state["leading_end"]))
+        sessions.extend(state["sessions"])
+        open_start = state["start"]
+    return sessions
 
-            if attendance_type == "Selesai Lembur":
-                last_end = (parsed, recorded_time)
-                continue
 
-            if attendance_type == "Mulai Lembur" and last_end is not None:
-                end_dt, end_time = last_end
-                hours = max((end_dt - parsed).total_seconds() / 3600.0, 8.0)
-                same_date = parsed.date() == end_dt.date()
-                sessions.append(
-                    {
-                        "mulai": recorded_time,
-                        "selesai": end_time,
-                        "hours": hours,
-                        "isValid": same_date,
-                    }
-                )
-                last_end = None
+OVERTIME_REDUCER = Reducer(OVERTIME_TYPES, _overtime_init, _overtime_update, _overtime_finalize, _overtime_combine)
 
-        summary[employee] = sessions
 
-    return summary
+def _calculate_overtime_durations(
+    records: Dict[str, List[List[str]]]
+) -> Dict[str, List[Dict[str, float]]]:
+    """Compute per-session overtime durations for each employee, whatever the order of the entries."""
+    return run_reducers(records, {"overtime": OVERTIME_REDUCER})["overtime"]
 
 
 def _calculate_total_overtime(
@@ -76,12 +88,17 @@ def _calculate_total_overtime(
 
     return total_overtime_hours
 
-def calculate_total_overtime_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None) -> str:
-    filtered = generate_filtered_report(input_file, OVERTIME_TYPES, start_date)
+def _overtime_payload(input_file: str, start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> Dict[str, dict]:
+    filtered = generate_filtered_report(input_file, OVERTIME_TYPES, start_date, dedup_window_seconds)
     durations = _calculate_overtime_durations(filtered)
     totals = _calculate_total_overtime(durations)
-    payload = json.dumps({"overtime_sessions": durations, "total_overtime_hours": totals}, ensure_ascii=False, indent=2)
-    return payload
+    if not detail:
+        return {"total_overtime_hours": totals}
+    return {"overtime_sessions": durations, "total_overtime_hours": totals}
+
+
+def calculate_total_overtime_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None, detail: bool = True, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> str:
+    return json.dumps(_overtime_payload(input_file, start_date, detail, dedup_window_seconds), ensure_ascii=False, indent=2)
 
 
 def main() -> None:
@@ -92,7 +109,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export.",
+        help="Path to the XLS or CSV/TSV export.",
     )
     parser.add_argument(
         "--date",
@@ -105,13 +122,35 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Only compute the per-employee totals and skip the breakdowns.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes a summary sheet plus one sheet per breakdown.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    payload = calculate_total_overtime_from_file(args.input, args.date)
+    payload = _overtime_payload(args.input, args.date, not args.summary_only, args.dedup_window)
     output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        write_payload_workbook(output_path, payload)
+        return
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
-        handle.write(payload)
+        handle.write(json.dumps(payload, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":
     main()
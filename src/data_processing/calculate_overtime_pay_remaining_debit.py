@@ -1,26 +1,35 @@
 import argparse
 import json
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Tuple
 
-from .calculate_debit_attendance import calculate_debit_from_file
-from .calculate_overtime import calculate_total_overtime_from_file
+from .calculate_debit_attendance import ATTENDANCE_TYPES, _calculate_debit
+from .calculate_overtime import OVERTIME_TYPES, _calculate_overtime_durations, _calculate_total_overtime
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
 from src.utils import OUTPUT_FOLDER
 
 OVERTIME_RATE_PER_HOUR = 15000
 
-def calculate_overtime_pay_and_remaining_debit_from_file(input_path: str, start_date = None) -> str:
-    debit_data = json.loads(calculate_debit_from_file(input_path, start_date)).get("debit_summary", {})
-    overtime_data = json.loads(calculate_total_overtime_from_file(input_path, start_date))
-    overtime_hours_data = overtime_data["total_overtime_hours"]
-
+def _calculate_overtime_pay_and_remaining_debit(
+    debit_data: Dict[str, float],
+    overtime_hours_data: Dict[str, float],
+    overtime_rate_per_hour: float = OVERTIME_RATE_PER_HOUR,
+) -> Tuple[Dict[str, float], Dict[str, float]]:
     overtime_to_be_paid: Dict[str, float] = {}
     remaining_debit: Dict[str, float] = {}
     for employee, debit_hours in debit_data.items():
         overtime_hours = overtime_hours_data.get(employee, 0.0)
-        overtime_to_be_paid[employee] = max(0.0, overtime_hours - debit_hours) * OVERTIME_RATE_PER_HOUR
+        overtime_to_be_paid[employee] = max(0.0, overtime_hours - debit_hours) * overtime_rate_per_hour
         remaining_debit[employee] = max(0.0, debit_hours - overtime_hours)
 
+    return overtime_to_be_paid, remaining_debit
+
+def calculate_overtime_pay_and_remaining_debit_from_file(input_path: str, start_date = None, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> str:
+    mapping = generate_filtered_report(input_path, ATTENDANCE_TYPES | OVERTIME_TYPES, start_date, dedup_window_seconds)
+    debit_data, _ = _calculate_debit(mapping, detail=False)
+    overtime_hours_data = _calculate_total_overtime(_calculate_overtime_durations(mapping))
+    overtime_to_be_paid, remaining_debit = _calculate_overtime_pay_and_remaining_debit(debit_data, overtime_hours_data)
+
     return json.dumps({"overtime_to_be_paid_in_rupiah": overtime_to_be_paid, "remaining_debit_hours": remaining_debit}, ensure_ascii=False, indent=2)
 
 
@@ -32,7 +41,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export.",
+        help="Path to the XLS or CSV/TSV export.",
     )
     parser.add_argument(
         "--date",
@@ -45,9 +54,15 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    payload = calculate_overtime_pay_and_remaining_debit_from_file(args.input, args.date)
+    payload = calculate_overtime_pay_and_remaining_debit_from_file(args.input, args.date, args.dedup_window)
     output_path = Path(OUTPUT_FOLDER) / args.out
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
@@ -1,11 +1,15 @@
 import argparse
 import json
-from calendar import monthrange
+import math
 from datetime import datetime, time
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from src.filter_report import generate_filtered_report
+from src.excel_writer import write_payload_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
+from src.geofence import SITES_CONFIG, SiteIndex, is_within_geofence, load_site_index
+from src.reducer_pipeline import Reducer, run_reducers
 from src.utils import OUTPUT_FOLDER, parse_datetime, ABSENSI_MASUK, ABSENSI_PULANG, A_IN, A_OUT, MULAI_KERJA_DI_RUMAH, SELESAI_KERJA_DI_RUMAH
 
 TIME_WINDOW = (time(8, 0), time(17, 0))
@@ -18,123 +22,195 @@ CHECK_IN_TYPES = {ABSENSI_MASUK, A_IN, MULAI_KERJA_DI_RUMAH}
 CHECK_OUT_TYPES = {ABSENSI_PULANG, A_OUT, SELESAI_KERJA_DI_RUMAH}
 
 
-def _get_number_of_days_in_month(year: int, month: int) -> int:
-    _, days = monthrange(year, month)
-    return days
+def _count_valid_invalid_days(valid_value: float, invalid_value: float, is_valid: bool, attendance_type: str) -> tuple[float, float]:
+    """Count a day's check-in or check-out once, at the step of its earliest valid (and invalid) scan.
+
+    Scans arrive in time order, so on a day mixing home (0.25) and office
+    (0.5) scans the earliest one decides the step whatever order the export
+    listed them in, as the newest-first export always did.
+    """
+    step = 0.25 if attendance_type in HOME_TYPES else 0.5
+    if is_valid:
+        valid_value = valid_value or step
+    else:
+        invalid_value = invalid_value or -step
+    return valid_value, invalid_value
+
+def _record_scan(
+    scans: List[Tuple[int, str, float]],
+    attendance,
+    parsed: datetime,
+    site_index: Optional[SiteIndex],
+) -> None:
+    """Record one attendance as (0 for check-in or 1 for check-out, type, hours past its tolerance boundary).
 
-def get_date_to_attendances(json_data) -> Dict[str, Dict[str, list]]:
-    """Return employee -> date (YYYY-MM-DD) -> list of attendance records."""
-    summary = {}
+    The hours do not depend on the tolerance, so every tolerance is judged
+    from the same recorded scans: A IN/A OUT are valid under any tolerance
+    and scans outside every fence under none.
+    """
+    attendance_type = attendance[0]
+    if attendance_type in CHECK_IN_TYPES:
+        slot = 0
+        deviation = (parsed - datetime.combine(parsed.date(), TIME_WINDOW[0])).total_seconds() / 3600.0
+        if attendance_type == A_IN:
+            deviation = -math.inf
+    elif attendance_type in CHECK_OUT_TYPES:
+        slot = 1
+        deviation = (datetime.combine(parsed.date(), TIME_WINDOW[1]) - parsed).total_seconds() / 3600.0
+        if attendance_type == A_OUT:
+            deviation = -math.inf
+    else:
+        return
+    # Work-from-home scans are taken at home, outside every office fence.
+    is_fenced = site_index is not None and attendance_type not in HOME_TYPES and len(attendance) > 2
+    if is_fenced and not is_within_geofence(site_index, attendance[2]):
+        deviation = math.inf
+    scans.append((slot, attendance_type, deviation))
 
-    for employee, records in json_data.items():
-        date_map = {}
+def first_attendance_month(json_data) -> Optional[Tuple[int, int]]:
+    """Return the (year, month) the working days are counted for: that of the first employee's first record."""
+    for records in json_data.values():
         for record in records:
             if len(record) < 2:
                 continue
-            recorded_time = record[1]
-            parsed = parse_datetime(str(recorded_time))
-            if not parsed:
-                continue
-            date_key = parsed.strftime("%Y-%m-%d")
-            date_map.setdefault(date_key, []).append(record)
-        summary[employee] = date_map
+            parsed = parse_datetime(str(record[1]))
+            if parsed:
+                return parsed.year, parsed.month
+        return None
+    return None
 
-    return summary
+def _working_days_init() -> List[Tuple[int, str, float]]:
+    return []
 
-def _count_valid_invalid_days(valid_value: float, invalid_value: float, is_valid: bool, attendance_type: str) -> tuple[float, float]:
-    step = 0.25 if attendance_type in HOME_TYPES else 0.5
-    if is_valid:
-        valid_value = min(valid_value + step, step)
-    else:
-        invalid_value = max(invalid_value - step, -step)
-    return valid_value, invalid_value
+def _working_days_finalize(
+    scans: List[Tuple[int, str, float]], day, max_validity_tolerances: Sequence[float] = (MAX_VALIDITY_TOLERANCE,)
+) -> List[List[float]]:
+    """Return the day's [valid_check_in, valid_check_out, invalid_check_in, invalid_check_out] under each tolerance."""
+    per_tolerance: List[List[float]] = []
+    for max_validity_tolerance in max_validity_tolerances:
+        counts = [0.0, 0.0, 0.0, 0.0]
+        for slot, attendance_type, deviation in scans:
+            counts[slot], counts[slot + 2] = _count_valid_invalid_days(
+                counts[slot], counts[slot + 2], deviation < max_validity_tolerance, attendance_type
+            )
+        per_tolerance.append(counts)
+    return per_tolerance
 
-def calculate_valid_invalid_working_days_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None) -> str:
-    mapping = generate_filtered_report(input_file, ATTENDANCE_TYPES, start_date)
-    payload = json.dumps(mapping, ensure_ascii=False, indent=2)
-    employee_to_date_attendances = get_date_to_attendances(json.loads(payload))
+def _working_days_combine(days, month: Optional[Tuple[int, int]], detail: bool) -> Tuple[float, float, list, list]:
+    """Return valid days, invalid days and, with ``detail``, their per-date breakdowns within ``month`` (every date if None)."""
+    valid_days, invalid_days = 0.0, 0.0
+    breakdown_valid_days: List[Dict[str, float]] = []
+    breakdown_invalid_days: List[Dict[str, float]] = []
+    for day, per_tolerance in days:
+        valid_check_in, valid_check_out, invalid_check_in, invalid_check_out = per_tolerance[0]
+        if month is not None and (day.year, day.month) != month:
+            continue
+        valid_days += valid_check_in + valid_check_out
+        invalid_days += invalid_check_in + invalid_check_out
+        if detail:
+            breakdown_valid_days.append(
+                {"date": day.isoformat(), "valid_check_in_count": valid_check_in, "valid_check_out_count": valid_check_out}
+            )
+            breakdown_invalid_days.append(
+                {"date": day.isoformat(), "invalid_check_in_count": invalid_check_in, "invalid_check_out_count": invalid_check_out}
+            )
+    return valid_days, invalid_days, breakdown_valid_days, breakdown_invalid_days
 
-    try: 
-        date_to_attendances = next(iter(employee_to_date_attendances.values()))
-        date = next(iter(date_to_attendances.keys()))
-    except StopIteration:
-        print("WARNING: No attendance records found in the input file, can't calculate valid/invalid working days.")
-        return json.dumps({}, ensure_ascii=False, indent=2)
-    parsed_date = datetime.strptime(date, "%Y-%m-%d")
-    number_of_days = _get_number_of_days_in_month(parsed_date.year, parsed_date.month)
-
-    employee_to_valid_days: Dict[str, float] = {}
-    breakdown_valid_days: Dict[str, List[Dict[str, float]]] = {}
-    employee_to_invalid_days: Dict[str, float] = {}
-    breakdown_invalid_days: Dict[str, List[Dict[str, float]]] = {}
-    for employee, date_to_attendances in employee_to_date_attendances.items():
-        valid_days = 0.0
-        invalid_days = 0.0
-
-        for date in range(1, number_of_days + 1):
-            date_key = f"{parsed_date.year}-{parsed_date.month:02d}-{date:02d}"
-            attendances = date_to_attendances.get(date_key, [])
-            if not attendances:
-                continue
-            
-            valid_check_in, valid_check_out = 0.0, 0.0
-            invalid_check_in, invalid_check_out = 0.0, 0.0
-            for attendance in attendances:
-                attendance_type, recorded_time = attendance[0], attendance[1]
-
-                parsed = parse_datetime(str(recorded_time))
-                if not parsed:
-                    raise ValueError(f"Cannot parse datetime: {recorded_time}")
-                
-                target_start_dt = datetime.combine(parsed.date(), TIME_WINDOW[0])
-                target_end_dt = datetime.combine(parsed.date(), TIME_WINDOW[1])
-
-                delta_start_hours = (parsed - target_start_dt).total_seconds() / 3600.0
-                delta_end_hours = (parsed - target_end_dt).total_seconds() / 3600.0
-
-                is_check_in_valid = attendance_type == A_IN or (attendance_type in CHECK_TOLERANCE_IN and delta_start_hours < MAX_VALIDITY_TOLERANCE)
-                is_check_out_valid = attendance_type == A_OUT or (attendance_type in CHECK_TOLERANCE_OUT and -delta_end_hours < MAX_VALIDITY_TOLERANCE)
-
-                if attendance_type in CHECK_IN_TYPES:
-                    valid_check_in, invalid_check_in = _count_valid_invalid_days(
-                        valid_check_in, invalid_check_in, is_check_in_valid, attendance_type
-                    )
-                if attendance_type in CHECK_OUT_TYPES:
-                    valid_check_out, invalid_check_out = _count_valid_invalid_days(
-                        valid_check_out, invalid_check_out, is_check_out_valid, attendance_type
-                    ) 
-
-            valid_days += valid_check_in + valid_check_out
-            invalid_days += invalid_check_in + invalid_check_out
-            
-            breakdown_valid_days[employee] = breakdown_valid_days.get(employee, []) + [
-                {
-                    "date": parsed.date().isoformat(),
-                    "valid_check_in_count": valid_check_in,
-                    "valid_check_out_count": valid_check_out,
-                }
-            ]
-            breakdown_invalid_days[employee] = breakdown_invalid_days.get(employee, []) + [
-                {
-                    "date": parsed.date().isoformat(),
-                    "invalid_check_in_count": invalid_check_in,
-                    "invalid_check_out_count": invalid_check_out,
-                }
-            ]
-
-        employee_to_valid_days[employee] = valid_days
-        employee_to_invalid_days[employee] = invalid_days
-    
-    return json.dumps({
-            "valid_working_days": employee_to_valid_days, 
-            "invalid_working_days": employee_to_invalid_days, 
-            "valid_days_breakdown": breakdown_valid_days, 
-            "invalid_days_breakdown": breakdown_invalid_days
-        }, 
-        ensure_ascii=False, 
-        indent=2
+def _working_days_sweep_combine(
+    days, month: Tuple[int, int], tolerance_count: int
+) -> List[Tuple[float, float]]:
+    """Return (valid days, invalid days) within ``month`` under each tolerance."""
+    totals = [[0.0, 0.0] for _ in range(tolerance_count)]
+    for day, per_tolerance in days:
+        if (day.year, day.month) != month:
+            continue
+        for total, (valid_check_in, valid_check_out, invalid_check_in, invalid_check_out) in zip(totals, per_tolerance):
+            total[0] += valid_check_in + valid_check_out
+            total[1] += invalid_check_in + invalid_check_out
+    return [tuple(total) for total in totals]
+
+def working_days_reducer(
+    month: Optional[Tuple[int, int]],
+    detail: bool = False,
+    site_index: Optional[SiteIndex] = None,
+    max_validity_tolerance: float = MAX_VALIDITY_TOLERANCE,
+) -> Reducer:
+    """Return the working-days plugin counting the days of ``month`` (see ``first_attendance_month``).
+
+    With ``month`` None every date is counted.
+    """
+    return Reducer(
+        ATTENDANCE_TYPES,
+        _working_days_init,
+        partial(_record_scan, site_index=site_index),
+        partial(_working_days_finalize, max_validity_tolerances=(max_validity_tolerance,)),
+        partial(_working_days_combine, month=month, detail=detail),
+    )
+
+def working_days_sweep_reducer(
+    month: Tuple[int, int],
+    max_validity_tolerances: Sequence[float],
+    site_index: Optional[SiteIndex] = None,
+) -> Reducer:
+    """Return a working-days plugin counting ``month`` under every tolerance of ``max_validity_tolerances`` in one pass."""
+    tolerances = tuple(max_validity_tolerances)
+    return Reducer(
+        ATTENDANCE_TYPES,
+        _working_days_init,
+        partial(_record_scan, site_index=site_index),
+        partial(_working_days_finalize, max_validity_tolerances=tolerances),
+        partial(_working_days_sweep_combine, month=month, tolerance_count=len(tolerances)),
     )
 
+def _calculate_valid_invalid_working_days(
+    json_data,
+    detail: bool = True,
+    site_index: Optional[SiteIndex] = None,
+    max_validity_tolerance: float = MAX_VALIDITY_TOLERANCE,
+) -> Optional[Dict[str, dict]]:
+    """Compute valid/invalid working days and, with ``detail``, their per-date breakdowns.
+
+    With ``site_index``, office records carrying an Alamat outside every
+    site's geofence are counted as invalid regardless of their time.
+
+    Returns None when there is no attendance record to derive the month from.
+    """
+    month = first_attendance_month(json_data)
+    if month is None:
+        return None
+
+    reducer = working_days_reducer(month, detail, site_index, max_validity_tolerance)
+    results = run_reducers(json_data, {"working_days": reducer})["working_days"]
+    employee_to_valid_days = {employee: days[0] for employee, days in results.items()}
+    employee_to_invalid_days = {employee: days[1] for employee, days in results.items()}
+    if not detail:
+        return {
+            "valid_working_days": employee_to_valid_days,
+            "invalid_working_days": employee_to_invalid_days,
+        }
+
+    return {
+        "valid_working_days": employee_to_valid_days, 
+        "invalid_working_days": employee_to_invalid_days, 
+        "valid_days_breakdown": {employee: days[2] for employee, days in results.items() if days[2]}, 
+        "invalid_days_breakdown": {employee: days[3] for employee, days in results.items() if days[3]}
+    }
+
+def _working_days_payload(input_file: str, start_date = None, detail: bool = True, sites_path: Optional[str] = None, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> Dict[str, dict]:
+    site_index = load_site_index(sites_path) if sites_path else None
+    mapping = generate_filtered_report(
+        input_file, ATTENDANCE_TYPES, start_date, dedup_window_seconds, include_location=site_index is not None
+    )
+    result = _calculate_valid_invalid_working_days(mapping, detail, site_index)
+    if result is None:
+        print("WARNING: No attendance records found in the input file, can't calculate valid/invalid working days.")
+        return {}
+
+    return result
+
+def calculate_valid_invalid_working_days_from_file(input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx", start_date = None, detail: bool = True, sites_path: Optional[str] = None, dedup_window_seconds: float = DEDUP_WINDOW_SECONDS) -> str:
+    return json.dumps(_working_days_payload(input_file, start_date, detail, sites_path, dedup_window_seconds), ensure_ascii=False, indent=2)
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Calculate valid and invalid working days from the attendance criteria"
@@ -143,7 +219,7 @@ def main() -> None:
         "--input",
         "-i",
         default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
-        help="Path to the XLS export"
+        help="Path to the XLS or CSV/TSV export"
     )
     parser.add_argument(
         "--date",
@@ -156,13 +232,40 @@ def main() -> None:
         "-o",
         help="Write JSON output to a file instead of stdout.",
     )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Only compute the per-employee totals and skip the breakdowns.",
+    )
+    parser.add_argument(
+        "--sites",
+        default=None,
+        help=f"Site geofence config (e.g. {SITES_CONFIG}); scans outside every site count as invalid.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes a summary sheet plus one sheet per breakdown.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
     args = parser.parse_args()
 
-    output = calculate_valid_invalid_working_days_from_file(args.input, args.date)
+    payload = _working_days_payload(args.input, args.date, not args.summary_only, args.sites, args.dedup_window)
     output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        write_payload_workbook(output_path, payload)
+        return
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as handle:
-        handle.write(output)
+        handle.write(json.dumps(payload, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":
     main()
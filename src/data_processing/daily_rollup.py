@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Materialize per-employee daily rollups and answer period summaries from them."""
+
+import argparse
+import json
+from calendar import monthrange
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .calculate_debit_attendance import DEBIT_REDUCER
+from .calculate_meals_count import meals_reducer
+from .calculate_overtime import OVERTIME_REDUCER
+from .calculate_overtime_pay_remaining_debit import OVERTIME_RATE_PER_HOUR
+from .calculate_valid_invalid_working_days import working_days_reducer
+from src.filter_report import DEDUP_WINDOW_SECONDS, generate_filtered_report
+from src.geofence import SITES_CONFIG, SiteIndex, load_site_index
+from src.reducer_pipeline import run_reducers
+from src.utils import ALL_TYPES, OUTPUT_FOLDER, parse_datetime
+
+ROLLUP_FIELDS = (
+    "debit_hours",
+    "overtime_hours",
+    "valid_working_days",
+    "invalid_working_days",
+    "meals_count",
+)
+PERIOD_LENGTHS = {"weekly": 7, "biweekly": 14}
+
+Rollup = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def _row(rollup: Rollup, employee: str, date_key: str) -> Dict[str, float]:
+    rows = rollup.setdefault(employee, {})
+    if date_key not in rows:
+        rows[date_key] = {field: 0.0 for field in ROLLUP_FIELDS}
+    return rows[date_key]
+
+
+def build_daily_rollup(mapping, site_index: Optional[SiteIndex] = None) -> Rollup:
+    """Return employee -> date (YYYY-MM-DD) -> summed metrics for that day.
+
+    ``mapping`` is a single ingest of the report holding every attendance,
+    overtime and meal record; every calculator is fed by one sweep over it.
+    With ``site_index``, out-of-fence scans count as invalid working days.
+    """
+    rollup: Rollup = {}
+    reducers = {
+        "debit": DEBIT_REDUCER,
+        "overtime": OVERTIME_REDUCER,
+        "working_days": working_days_reducer(None, detail=True, site_index=site_index),
+        "meals": meals_reducer(),
+    }
+    results = run_reducers(mapping, reducers)
+
+    for employee, (_, per_date) in results["debit"].items():
+        for date_key, hours in per_date.items():
+            _row(rollup, employee, date_key)["debit_hours"] += hours
+
+    for employee, sessions in results["overtime"].items():
+        for session in sessions:
+            if not session.get("isValid"):
+                continue
+            parsed = parse_datetime(str(session["mulai"]))
+            date_key = parsed.date().isoformat()
+            _row(rollup, employee, date_key)["overtime_hours"] += float(session.get("hours", 0.0) or 0.0)
+
+    for employee, (_, _, valid_entries, invalid_entries) in results["working_days"].items():
+        for entry in valid_entries:
+            row = _row(rollup, employee, entry["date"])
+            row["valid_working_days"] += entry["valid_check_in_count"] + entry["valid_check_out_count"]
+        for entry in invalid_entries:
+            row = _row(rollup, employee, entry["date"])
+            row["invalid_working_days"] += entry["invalid_check_in_count"] + entry["invalid_check_out_count"]
+
+    for employee, (_, _, meals_by_date) in results["meals"].items():
+        for meal_date, meals in meals_by_date.items():
+            _row(rollup, employee, meal_date.isoformat())["meals_count"] += len(meals)
+
+    for employee in mapping:
+        rollup.setdefault(employee, {})
+
+    return {
+        employee: dict(sorted(rows.items()))
+        for employee, rows in sorted(rollup.items())
+    }
+
+
+def build_daily_rollup_from_file(
+    input_file = "report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
+    start_date = None,
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+    sites_path: Optional[str] = None,
+) -> Rollup:
+    site_index = load_site_index(sites_path) if sites_path else None
+    mapping = generate_filtered_report(
+        input_file, ALL_TYPES, start_date, dedup_window_seconds, include_location=site_index is not None
+    )
+    return build_daily_rollup(mapping, site_index)
+
+
+def summarize_period(
+    rollup: Rollup,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Sum rollup rows within [period_start, period_end] into per-employee summaries."""
+    start_key = period_start.isoformat() if period_start else None
+    end_key = period_end.isoformat() if period_end else None
+
+    summary: Dict[str, Dict[str, float]] = {}
+    for employee, rows in rollup.items():
+        totals = {field: 0.0 for field in ROLLUP_FIELDS}
+        for date_key, row in rows.items():
+            if start_key is not None and date_key < start_key:
+                continue
+            if end_key is not None and date_key > end_key:
+                continue
+            for field in ROLLUP_FIELDS:
+                totals[field] += row.get(field, 0.0)
+
+        debit_hours = totals["debit_hours"]
+        overtime_hours = totals["overtime_hours"]
+        summary[employee] = {
+            "valid_working_days": totals["valid_working_days"],
+            "invalid_working_days": totals["invalid_working_days"],
+            "overtime_to_be_paid_in_rupiah": max(0.0, overtime_hours - debit_hours) * OVERTIME_RATE_PER_HOUR,
+            "remaining_debit_hours": max(0.0, debit_hours - overtime_hours),
+            "meals_count": int(totals["meals_count"]),
+        }
+
+    return summary
+
+
+def iter_periods(first: date, last: date, period: str) -> Iterator[Tuple[date, date]]:
+    """Yield consecutive (start, end) ranges of ``period`` covering [first, last]."""
+    current = first
+    while current <= last:
+        if period == "monthly":
+            _, days = monthrange(current.year, current.month)
+            end = date(current.year, current.month, days)
+        elif period in PERIOD_LENGTHS:
+            end = current + timedelta(days=PERIOD_LENGTHS[period] - 1)
+        else:
+            raise ValueError(f"Unknown period: {period}")
+        yield current, min(end, last)
+        current = end + timedelta(days=1)
+
+
+def _rollup_date_range(rollup: Rollup) -> Optional[Tuple[date, date]]:
+    date_keys: List[str] = [date_key for rows in rollup.values() for date_key in rows]
+    if not date_keys:
+        return None
+    return date.fromisoformat(min(date_keys)), date.fromisoformat(max(date_keys))
+
+
+def summarize_periods(rollup: Rollup, period: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Return "start/end" -> per-employee summary for every ``period`` in the rollup."""
+    date_range = _rollup_date_range(rollup)
+    if date_range is None:
+        return {}
+
+    return {
+        f"{start.isoformat()}/{end.isoformat()}": summarize_period(rollup, start, end)
+        for start, end in iter_periods(date_range[0], date_range[1], period)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build per-employee daily rollups once and summarize them over arbitrary periods."
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
+        help="Path to the XLS or CSV/TSV export.",
+    )
+    parser.add_argument(
+        "--date",
+        "-d",
+        default=None,
+        help="Starting date of the resulting filtered report.",
+    )
+    parser.add_argument(
+        "--rollup",
+        default=None,
+        help="Read a previously written rollup JSON instead of ingesting the export.",
+    )
+    parser.add_argument(
+        "--rollup-out",
+        default=None,
+        help="Also write the materialized rollup JSON to this file.",
+    )
+    parser.add_argument(
+        "--period",
+        "-p",
+        choices=["weekly", "biweekly", "monthly"],
+        default=None,
+        help="Summarize every consecutive period of this length.",
+    )
+    parser.add_argument(
+        "--from",
+        dest="period_start",
+        default=None,
+        help="Start date (YYYY-MM-DD) of a custom summary period.",
+    )
+    parser.add_argument(
+        "--to",
+        dest="period_end",
+        default=None,
+        help="End date (YYYY-MM-DD) of a custom summary period.",
+    )
+    parser.add_argument(
+        "--out",
+        "-o",
+        help="Write JSON output to a file instead of stdout.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
+    parser.add_argument(
+        "--sites",
+        default=None,
+        help=f"Site geofence config (e.g. {SITES_CONFIG}); scans outside every site count as invalid.",
+    )
+    args = parser.parse_args()
+
+    if args.rollup:
+        with open(args.rollup, encoding="utf-8") as handle:
+            rollup = json.load(handle)
+    else:
+        rollup = build_daily_rollup_from_file(args.input, args.date, args.dedup_window, args.sites)
+
+    if args.rollup_out:
+        rollup_path = Path(OUTPUT_FOLDER) / args.rollup_out
+        rollup_path.parent.mkdir(parents=True, exist_ok=True)
+        with rollup_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps(rollup, ensure_ascii=False, indent=2))
+
+    if args.period:
+        result = summarize_periods(rollup, args.period)
+    else:
+        period_start = date.fromisoformat(args.period_start) if args.period_start else None
+        period_end = date.fromisoformat(args.period_end) if args.period_end else None
+        result = summarize_period(rollup, period_start, period_end)
+
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    output_path = Path(OUTPUT_FOLDER) / args.out
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as handle:
+        handle.write(payload)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Stream calculator payloads into payroll-ready .xlsx workbooks."""
+
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+EMPLOYEE_COLUMN = "Nama Karyawan"
+SUMMARY_SHEET = "Summary"
+MAX_SHEET_TITLE_LENGTH = 31
+
+# Payload key -> (sheet title, columns of each breakdown entry).
+BREAKDOWN_SHEETS: Dict[str, Tuple[str, List[str]]] = {
+    "employee_debit_breakdown": ("Debit", ["date", "debit_hours"]),
+    "overtime_sessions": ("Overtime Sessions", ["mulai", "selesai", "hours", "isValid"]),
+    "valid_days_breakdown": ("Valid Days", ["date", "valid_check_in_count", "valid_check_out_count"]),
+    "invalid_days_breakdown": ("Invalid Days", ["date", "invalid_check_in_count", "invalid_check_out_count"]),
+    "meal_hours_breakdown": (
+        "Meals",
+        ["meal_type", "check_in_time", "check_out_time", "mulai", "selesai", "duration", "is_eligible", "is_entitled"],
+    ),
+}
+
+Sheet = Tuple[str, List[str], Iterable[Sequence]]
+
+
+def write_workbook(output_path: Union[str, Path], sheets: Iterable[Sheet]) -> None:
+    """Write (title, header, rows) sheets with a write-only workbook.
+
+    Rows are consumed lazily and flushed to disk as they are appended, so the
+    full workbook is never held in memory.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise ImportError("Writing .xlsx output requires openpyxl (pip install openpyxl).") from exc
+
+    workbook = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title=title[:MAX_SHEET_TITLE_LENGTH])
+        sheet.append(header)
+        for row in rows:
+            sheet.append(list(row))
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(str(output_path))
+
+
+def summary_sheet(summary: Dict[str, Dict[str, float]], title: str = SUMMARY_SHEET) -> Sheet:
+    """Return a sheet for an employee -> {metric: value} summary."""
+    columns = list(next(iter(summary.values()), {}).keys())
+    rows = ([employee, *(values.get(column) for column in columns)] for employee, values in summary.items())
+    return title, [EMPLOYEE_COLUMN, *columns], rows
+
+
+def breakdown_sheets(payload: Dict[str, dict]) -> Iterator[Sheet]:
+    """Yield one sheet per known breakdown present in ``payload``."""
+    for key, (title, columns) in BREAKDOWN_SHEETS.items():
+        if key in payload:
+            yield title, [EMPLOYEE_COLUMN, *columns], _breakdown_rows(payload[key], columns)
+
+
+def _breakdown_rows(breakdown: Dict[str, Union[dict, list]], columns: List[str]) -> Iterator[List]:
+    for employee, entries in breakdown.items():
+        if isinstance(entries, dict):
+            for key, value in entries.items():
+                yield [employee, key, value]
+            continue
+        for entry in entries:
+            yield [employee, *(entry.get(column) for column in columns)]
+
+
+def write_payload_workbook(output_path: Union[str, Path], payload: Dict[str, dict]) -> None:
+    """Write a calculator payload: per-employee totals on the summary sheet, then its breakdowns."""
+    totals = [key for key in payload if key not in BREAKDOWN_SHEETS]
+    employees = sorted({employee for key in totals for employee in payload[key]})
+    summary_rows = ([employee, *(payload[key].get(employee) for key in totals)] for employee in employees)
+
+    sheets: List[Sheet] = [(SUMMARY_SHEET, [EMPLOYEE_COLUMN, *totals], summary_rows)]
+    sheets.extend(breakdown_sheets(payload))
+    write_workbook(output_path, sheets)
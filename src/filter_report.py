@@ -1,44 +1,146 @@
 #!/usr/bin/env python3
-"""Extract key fields from the GPS attendance XLS export."""
+"""Extract key fields from the GPS attendance XLS or CSV/TSV export."""
 
+import csv
 import json
 from collections import defaultdict
 from datetime import date, datetime
-from typing import DefaultDict, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from typing import DefaultDict, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-import xlrd
+from src.utils import (
+    parse_datetime,
+    ABSENSI_PULANG,
+    A_OUT,
+    SELESAI_KERJA_DI_RUMAH,
+    C_IN,
+    SELESAI_ISTIRAHAT,
+    MULAI_LEMBUR,
+)
 
-from src.utils import parse_datetime
+DEDUP_WINDOW_SECONDS = 30
+# Within a burst of same-type scans, keep the latest one for these types and
+# the earliest one otherwise, matching the scan each calculator relies on.
+KEEP_LATEST_TYPES = {ABSENSI_PULANG, A_OUT, SELESAI_KERJA_DI_RUMAH, C_IN, SELESAI_ISTIRAHAT, MULAI_LEMBUR}
+
+REQUIRED_COLUMNS = ["Nama Karyawan", "Tanggal Absensi", "Tipe Absensi"]
+LOCATION_COLUMN = "Alamat"
+DELIMITERS = {".csv": ",", ".tsv": "\t", ".tab": "\t"}
 
 def _build_map(
     path: str,
     include_type: Dict,
     start_datetime: datetime,
-) -> Dict[str, List[Tuple[str, str, str]]]:
-    """Return Nama Karyawan -> list of (Tipe Absensi, Tanggal Absensi, Alamat)."""
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+    include_location: bool = False,
+) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str, str]]]], int]:
+    """Return sheet -> Nama Karyawan -> list of (Tipe Absensi, Tanggal Absensi, Alamat) and the number of dropped duplicates.
+
+    Alamat is only read with ``include_location``; otherwise records are
+    (Tipe Absensi, Tanggal Absensi) pairs. Every sheet carrying the required
+    columns is treated as one branch, read one after another; sheets without
+    them are skipped. CSV/TSV exports are streamed as a single branch named
+    after the file.
+    """
+    delimiter = DELIMITERS.get(Path(path).suffix.lower())
+    if delimiter is not None:
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            rows = _delimited_rows(handle, delimiter, include_location)
+            mapping, dropped = _build_records(
+                rows, None, include_type, start_datetime, dedup_window_seconds, include_location
+            )
+        return {Path(path).stem: mapping}, dropped
+
+    try:
+        import xlrd
+    except ImportError as exc:
+        raise ImportError("Reading Excel exports requires xlrd (pip install xlrd).") from exc
+
     workbook = xlrd.open_workbook(path)
-    sheet = workbook.sheet_by_index(0)
+    sheets = [sheet for sheet in workbook.sheets() if not _missing_columns(sheet)]
+    if not sheets:
+        missing = _missing_columns(workbook.sheet_by_index(0))
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    results = [
+        _build_records(
+            _sheet_rows(sheet, include_location),
+            workbook,
+            include_type,
+            start_datetime,
+            dedup_window_seconds,
+            include_location,
+        )
+        for sheet in sheets
+    ]
+
+    branches = {sheet.name: mapping for sheet, (mapping, _) in zip(sheets, results)}
+    return branches, sum(dropped for _, dropped in results)
+
+
+def _missing_columns(sheet) -> List[str]:
+    headers = [str(cell).strip() for cell in sheet.row_values(0)] if sheet.nrows else []
+    return [field for field in REQUIRED_COLUMNS if field not in headers]
 
+
+def _sheet_rows(sheet, include_location: bool = False) -> Iterator[Tuple[object, object, object, object]]:
+    """Yield the raw (Nama Karyawan, Tipe Absensi, Tanggal Absensi, Alamat) cells of every data row."""
     headers = [str(cell).strip() for cell in sheet.row_values(0)]
-    required = ["Nama Karyawan", "Tanggal Absensi", "Tipe Absensi"]
-    missing = [field for field in required if field not in headers]
+    col_index = {name: headers.index(name) for name in REQUIRED_COLUMNS}
+    location_idx = headers.index(LOCATION_COLUMN) if include_location and LOCATION_COLUMN in headers else None
+
+    for row_idx in range(1, sheet.nrows):
+        row = sheet.row_values(row_idx)
+        yield (
+            row[col_index["Nama Karyawan"]],
+            row[col_index["Tipe Absensi"]],
+            row[col_index["Tanggal Absensi"]],
+            row[location_idx] if location_idx is not None else "",
+        )
+
+
+def _delimited_rows(handle, delimiter: str, include_location: bool = False) -> Iterator[Tuple[str, str, str, str]]:
+    """Stream the required columns of a CSV/TSV export, skipping short or blank lines."""
+    reader = csv.reader(handle, delimiter=delimiter)
+    headers = [cell.strip() for cell in next(reader, [])]
+    missing = [field for field in REQUIRED_COLUMNS if field not in headers]
     if missing:
         raise ValueError(f"Missing columns: {', '.join(missing)}")
 
-    col_index = {name: headers.index(name) for name in required}
-    records: DefaultDict[str, List[Tuple[str, str, str]]] = defaultdict(list)
+    name_idx = headers.index("Nama Karyawan")
+    type_idx = headers.index("Tipe Absensi")
+    date_idx = headers.index("Tanggal Absensi")
+    location_idx = headers.index(LOCATION_COLUMN) if include_location and LOCATION_COLUMN in headers else None
+    width = max(name_idx, type_idx, date_idx)
 
-    for row_idx in range(1, sheet.nrows):
-        row = sheet.row_values(row_idx)
-        name = str(row[col_index["Nama Karyawan"]]).strip()
+    for row in reader:
+        if len(row) <= width:
+            continue
+        alamat = row[location_idx] if location_idx is not None and location_idx < len(row) else ""
+        yield row[name_idx], row[type_idx], row[date_idx], alamat
+
+
+def _build_records(
+    rows: Iterable[Tuple[object, object, object, object]],
+    workbook,
+    include_type: Dict,
+    start_datetime: datetime,
+    dedup_window_seconds: float,
+    include_location: bool = False,
+) -> Tuple[Dict[str, List[Tuple[str, ...]]], int]:
+    records: DefaultDict[str, List[Tuple[str, str, datetime, str]]] = defaultdict(list)
+    seen = set()
+    dropped = 0
+
+    for raw_name, raw_type, raw_date, raw_location in rows:
+        name = str(raw_name).strip()
         if not name:
             continue
 
-        tipe_absensi = str(row[col_index["Tipe Absensi"]]).strip()
+        tipe_absensi = str(raw_type).strip()
         if tipe_absensi not in include_type:
             continue
 
-        raw_date = row[col_index["Tanggal Absensi"]]
         tanggal_absensi = _extract_datetime(raw_date, workbook)
         parsed_datetime = _parse_row_datetime(tanggal_absensi)
         if not parsed_datetime:
@@ -46,14 +148,64 @@ def _build_map(
         if start_datetime is not None and parsed_datetime < start_datetime:
             continue
 
-        records[name].append((tipe_absensi, tanggal_absensi))
+        key = (name, tipe_absensi, tanggal_absensi)
+        if key in seen:
+            dropped += 1
+            continue
+        seen.add(key)
+
+        records[name].append((tipe_absensi, tanggal_absensi, parsed_datetime, str(raw_location).strip()))
+
+    mapping: Dict[str, List[Tuple[str, ...]]] = {}
+    for name, entries in records.items():
+        kept = _collapse_bursts(entries, dedup_window_seconds)
+        dropped += len(entries) - len(kept)
+        if include_location:
+            mapping[name] = [(tipe_absensi, tanggal_absensi, alamat) for tipe_absensi, tanggal_absensi, _, alamat in kept]
+        else:
+            mapping[name] = [(tipe_absensi, tanggal_absensi) for tipe_absensi, tanggal_absensi, _, _ in kept]
+
+    return mapping, dropped
+
+
+def _collapse_bursts(
+    entries: List[Tuple[str, str, datetime, str]],
+    window_seconds: float,
+) -> List[Tuple[str, str, datetime, str]]:
+    """Collapse same-type scans within ``window_seconds`` of the first scan of their burst, keeping file order.
+
+    Measuring from the burst's first scan bounds every burst to the window,
+    so a slow trickle of scans is not chained into one.
+    """
+    if not window_seconds or window_seconds <= 0:
+        return entries
+
+    by_type: DefaultDict[str, List[int]] = defaultdict(list)
+    for index, entry in enumerate(entries):
+        by_type[entry[0]].append(index)
 
-    return dict(records)
+    dropped_indices = set()
+    for tipe_absensi, indices in by_type.items():
+        indices.sort(key=lambda index: entries[index][2])
+        keep_latest = tipe_absensi in KEEP_LATEST_TYPES
+        burst = [indices[0]]
+        for index in indices[1:]:
+            gap = (entries[index][2] - entries[burst[0]][2]).total_seconds()
+            if gap <= window_seconds:
+                burst.append(index)
+                continue
+            dropped_indices.update(burst[:-1] if keep_latest else burst[1:])
+            burst = [index]
+        dropped_indices.update(burst[:-1] if keep_latest else burst[1:])
+
+    return [entry for index, entry in enumerate(entries) if index not in dropped_indices]
 
 
 def _extract_datetime(raw_value, workbook) -> str:
     """Convert the Excel date/time cell to a YYYY-MM-DD HH:MM:SS string."""
-    if isinstance(raw_value, (int, float)):
+    if workbook is not None and isinstance(raw_value, (int, float)):
+        import xlrd
+
         try:
             dt = xlrd.xldate_as_datetime(raw_value, workbook.datemode)
             return dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -74,13 +226,57 @@ def generate_filtered_report(
     input_path: str,
     include_type: Dict,
     start_date: Optional[Union[str, date, datetime]] = None,
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+    by_branch: bool = False,
+    include_location: bool = False,
 ) -> Dict[str, List[Tuple[str, str, str]]]:
+    """Return the filtered report for every branch sheet combined.
+
+    With ``by_branch`` the result is keyed by sheet name first instead. With
+    ``include_location`` each record also carries its Alamat.
+    """
     start_datetime = _normalize_start_date(start_date) if start_date is not None else None
-    mapping = _build_map(input_path, include_type, start_datetime)
-    payload = json.dumps(mapping, ensure_ascii=False, indent=2)
+    branches, dropped = _build_map(
+        input_path, include_type, start_datetime, dedup_window_seconds, include_location
+    )
+    if dropped:
+        print(f"INFO: Dropped {dropped} duplicate scan(s) from {input_path}.")
+    result = branches if by_branch else combine_branches(branches)
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
     return json.loads(payload)
 
 
+def combine_branches(
+    branches: Dict[str, Dict[str, List[Tuple[str, str]]]],
+) -> Dict[str, List[Tuple[str, str]]]:
+    """Merge per-branch reports into one, keeping sheet order per employee."""
+    if len(branches) == 1:
+        return next(iter(branches.values()))
+
+    combined: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for mapping in branches.values():
+        for name, records in mapping.items():
+            combined[name].extend(records)
+    return dict(combined)
+
+
+def filter_by_type(
+    mapping: Dict[str, List[Tuple[str, str]]],
+    include_type: Dict,
+) -> Dict[str, List[Tuple[str, str]]]:
+    """Return the subset of an already-ingested report limited to ``include_type``.
+
+    Employees left without any matching record are dropped, mirroring what
+    ``generate_filtered_report`` returns when called with the same types.
+    """
+    filtered: Dict[str, List[Tuple[str, str]]] = {}
+    for name, records in mapping.items():
+        kept = [record for record in records if record and record[0] in include_type]
+        if kept:
+            filtered[name] = kept
+    return filtered
+
+
 def _parse_row_datetime(value: str) -> Optional[datetime]:
     parsed = parse_datetime(str(value))
     if parsed:
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Check GPS scan locations (Alamat) against the configured office geofences."""
+
+import json
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import DefaultDict, Dict, List, Optional, Tuple
+
+SITES_CONFIG = "sites.json"
+GRID_CELL_DEGREES = 0.01  # roughly 1.1 km of latitude
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+_COORDINATES = re.compile(r"(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+_ADDRESS_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+# (cell, cell) -> sites whose fence overlaps the cell, normalized site addresses,
+# and whether every site lists its addresses.
+SiteIndex = Tuple[Dict[Tuple[int, int], List[Tuple[str, float, float, float]]], Dict[str, str], bool]
+
+
+def load_sites(path: str = SITES_CONFIG) -> List[Dict]:
+    """Read the site list: a JSON array of {name, latitude, longitude, radius_m[, alamat]}.
+
+    ``alamat`` is an address, or a list of them, that free-text Alamat values
+    are matched against; they are only checked when every site lists one.
+    """
+    with open(path, encoding="utf-8") as handle:
+        sites = json.load(handle)
+
+    for site in sites:
+        missing = [field for field in ("name", "latitude", "longitude", "radius_m") if field not in site]
+        if missing:
+            raise ValueError(f"Site {site.get('name', '?')} is missing: {', '.join(missing)}")
+    return sites
+
+
+def build_site_index(sites: List[Dict]) -> SiteIndex:
+    """Bucket every site into each grid cell its fence's bounding box touches."""
+    grid: DefaultDict[Tuple[int, int], List[Tuple[str, float, float, float]]] = defaultdict(list)
+    addresses: Dict[str, str] = {}
+    every_site_addressed = bool(sites)
+
+    for site in sites:
+        latitude, longitude, radius = float(site["latitude"]), float(site["longitude"]), float(site["radius_m"])
+        lat_span = radius / METERS_PER_DEGREE
+        lon_span = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+
+        entry = (site["name"], latitude, longitude, radius)
+        for row in range(_cell(latitude - lat_span), _cell(latitude + lat_span) + 1):
+            for col in range(_cell(longitude - lon_span), _cell(longitude + lon_span) + 1):
+                grid[(row, col)].append(entry)
+
+        alamat = site.get("alamat", [])
+        site_addresses = [alamat] if isinstance(alamat, str) else alamat
+        for address in site_addresses:
+            addresses[_normalize_address(address)] = site["name"]
+        every_site_addressed = every_site_addressed and any(_normalize_address(address) for address in site_addresses)
+
+    return dict(grid), addresses, every_site_addressed
+
+
+def load_site_index(path: str = SITES_CONFIG) -> SiteIndex:
+    return build_site_index(load_sites(path))
+
+
+def find_site(index: SiteIndex, alamat: str) -> Optional[str]:
+    """Return the name of the site ``alamat`` falls in, or None when it is outside every fence.
+
+    A free-text ``alamat`` belongs to the site whose configured address it
+    contains, ignoring case and punctuation.
+    """
+    grid, addresses, _ = index
+    coordinates = parse_coordinates(alamat)
+    if coordinates is None:
+        return _match_address(addresses, alamat)
+
+    latitude, longitude = coordinates
+    for name, site_latitude, site_longitude, radius in grid.get((_cell(latitude), _cell(longitude)), []):
+        if _distance_m(latitude, longitude, site_latitude, site_longitude) <= radius:
+            return name
+    return None
+
+
+def is_within_geofence(index: SiteIndex, alamat: str) -> bool:
+    """Return False only for scans known to be outside every site.
+
+    Coordinates are checked against the fences. A free-text Alamat is only
+    checked when every site lists its addresses, and must then contain one of
+    them; otherwise it cannot be placed and is let through.
+    """
+    if not alamat or (parse_coordinates(alamat) is None and not index[2]):
+        return True
+    return find_site(index, alamat) is not None
+
+
+@lru_cache(maxsize=65536)
+def parse_coordinates(alamat: str) -> Optional[Tuple[float, float]]:
+    """Extract a "latitude, longitude" pair from the Alamat text, if it has one."""
+    match = _COORDINATES.search(str(alamat))
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def _cell(degrees: float) -> int:
+    return math.floor(degrees / GRID_CELL_DEGREES)
+
+
+def _normalize_address(alamat: str) -> str:
+    return " ".join(_ADDRESS_SEPARATORS.sub(" ", str(alamat).lower()).split())
+
+
+def _match_address(addresses: Dict[str, str], alamat: str) -> Optional[str]:
+    normalized = _normalize_address(alamat)
+    if normalized in addresses:
+        return addresses[normalized]
+
+    padded = f" {normalized} "
+    for address, name in addresses.items():
+        if address and f" {address} " in padded:
+            return name
+    return None
+
+
+def _distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
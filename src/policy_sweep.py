@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Evaluate a grid of attendance policy variants over one ingested report."""
+
+import argparse
+import json
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .data_processing.calculate_debit_attendance import (
+    ATTENDANCE_TYPES,
+    LATE_GRACE_PERIOD,
+    debit_sweep_reducer,
+)
+from .data_processing.calculate_meals_count import meals_reducer
+from .data_processing.calculate_overtime import OVERTIME_REDUCER, _calculate_total_overtime
+from .data_processing.calculate_overtime_pay_remaining_debit import (
+    OVERTIME_RATE_PER_HOUR,
+    _calculate_overtime_pay_and_remaining_debit,
+)
+from .data_processing.calculate_valid_invalid_working_days import (
+    MAX_VALIDITY_TOLERANCE,
+    first_attendance_month,
+    working_days_sweep_reducer,
+)
+from src.excel_writer import EMPLOYEE_COLUMN, write_workbook
+from src.filter_report import DEDUP_WINDOW_SECONDS, filter_by_type, generate_filtered_report
+from src.geofence import SITES_CONFIG, SiteIndex, load_site_index
+from src.reducer_pipeline import run_reducers
+from src.summary import build_summary
+from src.utils import ALL_TYPES, OUTPUT_FOLDER
+
+PARAMETERS = ("late_grace_period", "max_validity_tolerance", "overtime_rate_per_hour")
+
+
+def sweep_policies(
+    mapping,
+    late_grace_periods: Sequence[float] = (LATE_GRACE_PERIOD,),
+    max_validity_tolerances: Sequence[float] = (MAX_VALIDITY_TOLERANCE,),
+    overtime_rates: Sequence[float] = (OVERTIME_RATE_PER_HOUR,),
+    site_index: Optional[SiteIndex] = None,
+) -> List[Dict[str, dict]]:
+    """Return one {"scenario", "summary"} entry per combination of the parameter values.
+
+    Grace periods and tolerances are in hours. One sweep over the scans
+    feeds meals, overtime and a single debit and working-days reducer each:
+    every record's deltas are computed once and compared against the sorted
+    grace periods and tolerances.
+    """
+    month = first_attendance_month(filter_by_type(mapping, ATTENDANCE_TYPES))
+    grace_periods = sorted(set(late_grace_periods))
+    tolerances = sorted(set(max_validity_tolerances))
+
+    reducers = {
+        "meals": meals_reducer(),
+        "overtime": OVERTIME_REDUCER,
+        "debit": debit_sweep_reducer(grace_periods),
+    }
+    if month is not None:
+        reducers["working_days"] = working_days_sweep_reducer(month, tolerances, site_index)
+    reduced = run_reducers(mapping, reducers)
+
+    meals_count = {employee: count for employee, (count, _, _) in reduced["meals"].items()}
+    total_overtime = _calculate_total_overtime(reduced["overtime"])
+    debit_by_grace = {
+        grace: {employee: totals[index] for employee, totals in reduced["debit"].items()}
+        for index, grace in enumerate(grace_periods)
+    }
+    working_days = reduced.get("working_days", {})
+    working_days_by_tolerance = {
+        tolerance: {employee: days[index] for employee, days in working_days.items()}
+        for index, tolerance in enumerate(tolerances)
+    }
+
+    results: List[Dict[str, dict]] = []
+    for grace, tolerance, rate in product(late_grace_periods, max_validity_tolerances, overtime_rates):
+        overtime_to_be_paid, remaining_debit = _calculate_overtime_pay_and_remaining_debit(
+            debit_by_grace[grace], total_overtime, rate
+        )
+        days_by_employee = working_days_by_tolerance[tolerance]
+        summary = build_summary(
+            overtime_to_be_paid,
+            remaining_debit,
+            {employee: days[0] for employee, days in days_by_employee.items()},
+            {employee: days[1] for employee, days in days_by_employee.items()},
+            meals_count,
+        )
+        results.append({"scenario": dict(zip(PARAMETERS, (grace, tolerance, rate))), "summary": summary})
+
+    return results
+
+
+def sweep_policies_from_file(
+    input_path: str,
+    start_date = None,
+    late_grace_periods: Sequence[float] = (LATE_GRACE_PERIOD,),
+    max_validity_tolerances: Sequence[float] = (MAX_VALIDITY_TOLERANCE,),
+    overtime_rates: Sequence[float] = (OVERTIME_RATE_PER_HOUR,),
+    sites_path: Optional[str] = None,
+    dedup_window_seconds: float = DEDUP_WINDOW_SECONDS,
+) -> List[Dict[str, dict]]:
+    site_index = load_site_index(sites_path) if sites_path else None
+    mapping = generate_filtered_report(
+        input_path, ALL_TYPES, start_date, dedup_window_seconds, include_location=site_index is not None
+    )
+    return sweep_policies(mapping, late_grace_periods, max_validity_tolerances, overtime_rates, site_index)
+
+
+def _comparison_rows(results: List[Dict[str, dict]]) -> Iterator[List]:
+    for result in results:
+        scenario = [result["scenario"][parameter] for parameter in PARAMETERS]
+        for employee, values in result["summary"].items():
+            yield [*scenario, employee, *values.values()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare per-employee summaries across a grid of attendance policy variants."
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        default="report_scan_gps_2025-12-01_2025-12-31_20260101090802.xlsx",
+        help="Path to the XLS or CSV/TSV export.",
+    )
+    parser.add_argument(
+        "--date",
+        "-d",
+        default=None,
+        help="Starting date of the resulting filtered report.",
+    )
+    parser.add_argument(
+        "--late-grace-minutes",
+        type=float,
+        nargs="+",
+        default=[LATE_GRACE_PERIOD * 60],
+        help="Late check-in grace periods to compare, in minutes.",
+    )
+    parser.add_argument(
+        "--validity-tolerance-minutes",
+        type=float,
+        nargs="+",
+        default=[MAX_VALIDITY_TOLERANCE * 60],
+        help="Check-in/out validity tolerances to compare, in minutes.",
+    )
+    parser.add_argument(
+        "--overtime-rate",
+        type=float,
+        nargs="+",
+        default=[OVERTIME_RATE_PER_HOUR],
+        help="Overtime rates per hour to compare, in rupiah.",
+    )
+    parser.add_argument(
+        "--sites",
+        default=None,
+        help=f"Site geofence config (e.g. {SITES_CONFIG}); scans outside every site count as invalid.",
+    )
+    parser.add_argument(
+        "--out",
+        "-o",
+        help="Write JSON output to a file instead of stdout.",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "xlsx"],
+        default="json",
+        help="Output format; xlsx writes one comparison row per scenario and employee.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=float,
+        default=DEDUP_WINDOW_SECONDS,
+        help="Collapse same-type scans within this many seconds of a burst's first scan; 0 only drops exact duplicates.",
+    )
+    args = parser.parse_args()
+
+    results = sweep_policies_from_file(
+        args.input,
+        args.date,
+        [minutes / 60.0 for minutes in args.late_grace_minutes],
+        [minutes / 60.0 for minutes in args.validity_tolerance_minutes],
+        args.overtime_rate,
+        args.sites,
+        args.dedup_window,
+    )
+    output_path = Path(OUTPUT_FOLDER) / args.out
+    if args.format == "xlsx":
+        columns = list(next(iter(results[0]["summary"].values()), {}).keys()) if results else []
+        write_workbook(
+            output_path,
+            [("Scenarios", [*PARAMETERS, EMPLOYEE_COLUMN, *columns], _comparison_rows(results))],
+        )
+        return
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
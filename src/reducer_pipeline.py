@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Drive every calculator over one sorted sweep of the events, grouped per employee and date."""
+
+from collections import defaultdict
+from concurrent.futures import Executor
+from datetime import date, datetime
+from functools import partial
+from operator import itemgetter
+from typing import Any, Callable, DefaultDict, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from src.utils import parse_datetime
+
+MAX_CALCULATOR_WORKERS = 4
+
+
+class Reducer(NamedTuple):
+    """Calculator plugin; every hook must be picklable so shards can run in worker processes.
+
+    ``init() -> state`` opens an (employee, date) group the first time one of
+    ``types`` is seen on that date, ``update(state, record, parsed)`` folds one
+    record into it, ``finalize(state, day)`` closes the group and
+    ``combine([(day, finalized), ...])`` turns an employee's days, in date
+    order, into the employee's result.
+    """
+
+    types: Set[str]
+    init: Callable[[], Any]
+    update: Callable[[Any, Sequence[str], datetime], None]
+    finalize: Callable[[Any, date], Any]
+    combine: Callable[[List[Tuple[date, Any]]], Any]
+
+
+def run_reducers(
+    mapping: Dict[str, List[Sequence[str]]],
+    reducers: Dict[str, Reducer],
+    executor: Optional[Executor] = None,
+    shards: int = MAX_CALCULATOR_WORKERS,
+) -> Dict[str, Dict[str, Any]]:
+    """Return reducer name -> employee -> result, touching each record once.
+
+    Employees are independent, so with an ``executor`` they are split into
+    ``shards`` groups reduced concurrently; otherwise they run in-process.
+    """
+    items = list(mapping.items())
+    if executor is None or len(items) < 2:
+        return _reduce_employees(items, reducers)
+
+    groups = [items[index::shards] for index in range(shards) if items[index::shards]]
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in reducers}
+    for shard_results in executor.map(partial(_reduce_employees, reducers=reducers), groups):
+        for name, per_employee in shard_results.items():
+            results[name].update(per_employee)
+
+    order = {employee: index for index, (employee, _) in enumerate(items)}
+    return {
+        name: dict(sorted(per_employee.items(), key=lambda item: order[item[0]]))
+        for name, per_employee in results.items()
+    }
+
+
+def _reduce_employees(
+    items: List[Tuple[str, List[Sequence[str]]]],
+    reducers: Dict[str, Reducer],
+) -> Dict[str, Dict[str, Any]]:
+    routes: DefaultDict[str, List[str]] = defaultdict(list)
+    for name, reducer in reducers.items():
+        for attendance_type in reducer.types:
+            routes[attendance_type].append(name)
+
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in reducers}
+    for employee, records in items:
+        events = []
+        for record in records:
+            if len(record) < 2 or record[0] not in routes:
+                continue
+            parsed = parse_datetime(str(record[1]))
+            if parsed:
+                events.append((parsed, record))
+        events.sort(key=itemgetter(0))
+
+        days: DefaultDict[str, List[Tuple[date, Any]]] = defaultdict(list)
+        states: Dict[str, Any] = {}
+        current_day: Optional[date] = None
+        for parsed, record in events:
+            day = parsed.date()
+            if day != current_day:
+                _close_day(reducers, states, current_day, days)
+                states, current_day = {}, day
+
+            for name in routes[record[0]]:
+                if name not in states:
+                    states[name] = reducers[name].init()
+                reducers[name].update(states[name], record, parsed)
+        _close_day(reducers, states, current_day, days)
+
+        for name, finalized in days.items():
+            results[name][employee] = reducers[name].combine(finalized)
+
+    return results
+
+
+def _close_day(
+    reducers: Dict[str, Reducer],
+    states: Dict[str, Any],
+    day: Optional[date],
+    days: DefaultDict[str, List[Tuple[date, Any]]],
+) -> None:
+    for name, state in states.items():
+        days[name].append((day, reducers[name].finalize(state, day)))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Join the calculators' per-employee results into the combined summary rows."""
+
+from typing import Dict, Set
+
+
+def _collect_employee_names(*maps: Dict[str, object]) -> Set[str]:
+    employees: Set[str] = set()
+    for mapping in maps:
+        employees.update(mapping.keys())
+    return employees
+
+
+def build_summary(
+    overtime_to_be_paid: Dict[str, float],
+    remaining_debit: Dict[str, float],
+    valid_working_days: Dict[str, float],
+    invalid_working_days: Dict[str, float],
+    meals_count: Dict[str, int],
+) -> Dict[str, Dict[str, float]]:
+    employees = _collect_employee_names(
+        overtime_to_be_paid,
+        remaining_debit,
+        valid_working_days,
+        invalid_working_days,
+        meals_count,
+    )
+
+    summary: Dict[str, Dict[str, float]] = {}
+    for employee in sorted(employees):
+        summary[employee] = {
+            "valid_working_days": float(valid_working_days.get(employee, 0.0) or 0.0),
+            "invalid_working_days": float(
+                invalid_working_days.get(employee, 0.0) or 0.0
+            ),
+            "overtime_to_be_paid_in_rupiah": float(
+                overtime_to_be_paid.get(employee, 0.0) or 0.0
+            ),
+            "remaining_debit_hours": float(
+                remaining_debit.get(employee, 0.0) or 0.0
+            ),
+            "meals_count": int(meals_count.get(employee, 0) or 0),
+        }
+
+    return summary
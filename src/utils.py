@@ -15,6 +15,11 @@ A_IN = "A IN"
 A_OUT = "A OUT"
 C_IN = "C IN"
 C_OUT = "C OUT"
+ALL_TYPES = {
+    ABSENSI_MASUK, ABSENSI_PULANG, MULAI_KERJA_DI_RUMAH, SELESAI_KERJA_DI_RUMAH,
+    MULAI_LEMBUR, SELESAI_LEMBUR, MULAI_ISTIRAHAT, SELESAI_ISTIRAHAT,
+    A_IN, A_OUT, C_IN, C_OUT,
+}
 
 def parse_datetime(value: str) -> Optional[datetime]:
     """Parse a datetime string in YYYY-MM-DD HH:MM[:SS] format."""
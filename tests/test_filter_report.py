@@ -0,0 +1,39 @@
+import csv
+
+from src.filter_report import generate_filtered_report
+
+# Nine check-ins 21 seconds apart, newest first as in the export.
+TRICKLE = [f"2025-12-01 08:{seconds // 60:02d}:{seconds % 60:02d}" for seconds in range(168, -1, -21)]
+
+
+def _write_export(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["No", "Nama Karyawan", "Tanggal Absensi", "Tipe Absensi"])
+        for number, (tanggal, tipe) in enumerate(rows, start=1):
+            writer.writerow([number, "A", tanggal, tipe])
+
+
+def test_bursts_are_bounded_by_the_window(tmp_path):
+    path = tmp_path / "report.csv"
+    _write_export(path, [(tanggal, "Absensi Masuk") for tanggal in TRICKLE])
+
+    mapping = generate_filtered_report(str(path), {"Absensi Masuk"}, dedup_window_seconds=30)
+
+    # Bursts start at 0, 42, 84, 126 and 168 seconds; each keeps its earliest check-in.
+    assert [tanggal for _, tanggal in mapping["A"]] == [
+        "2025-12-01 08:02:48",
+        "2025-12-01 08:02:06",
+        "2025-12-01 08:01:24",
+        "2025-12-01 08:00:42",
+        "2025-12-01 08:00:00",
+    ]
+
+
+def test_zero_window_only_drops_exact_duplicates(tmp_path):
+    path = tmp_path / "report.csv"
+    _write_export(path, [(tanggal, "Absensi Masuk") for tanggal in TRICKLE + TRICKLE[:1]])
+
+    mapping = generate_filtered_report(str(path), {"Absensi Masuk"}, dedup_window_seconds=0)
+
+    assert [tanggal for _, tanggal in mapping["A"]] == TRICKLE
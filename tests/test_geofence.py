@@ -0,0 +1,52 @@
+from src.data_processing.calculate_valid_invalid_working_days import _calculate_valid_invalid_working_days
+from src.data_processing.daily_rollup import build_daily_rollup
+from src.geofence import build_site_index, find_site, is_within_geofence
+
+HQ = {"name": "HQ", "latitude": -6.2088, "longitude": 106.8456, "radius_m": 200}
+# Its fence crosses the -6.20 grid line, so it is bucketed into two rows of cells.
+EDGE = {"name": "Edge", "latitude": -6.2005, "longitude": 106.9000, "radius_m": 300}
+
+
+def test_grid_lookup_finds_sites_by_distance():
+    index = build_site_index([HQ, EDGE])
+
+    assert find_site(index, "-6.2080, 106.8460") == "HQ"
+    assert find_site(index, "Jl. Kantor, -6.1985, 106.9000") == "Edge"
+    assert find_site(index, "-6.2130, 106.8456") is None
+    assert find_site(index, "-6.1960, 106.9000") is None
+
+
+def test_text_addresses_are_only_checked_when_every_site_lists_one():
+    addressed = build_site_index(
+        [{**HQ, "alamat": "Jl. Sudirman No. 1, Jakarta"}, {**EDGE, "alamat": ["Jl. Tepi 5"]}]
+    )
+    partly_addressed = build_site_index([{**HQ, "alamat": "Jl. Sudirman No. 1, Jakarta"}, EDGE])
+
+    assert is_within_geofence(addressed, "Jl. Sudirman No.1 Jakarta Pusat")
+    assert not is_within_geofence(addressed, "Jl. Thamrin 10, Jakarta")
+    assert is_within_geofence(partly_addressed, "Jl. Thamrin 10, Jakarta")
+    assert not is_within_geofence(partly_addressed, "-6.5000, 106.0000")
+
+
+FAR_AWAY = "-6.9000, 107.6000"
+HOME_AND_OFFICE_DAYS = [
+    ("Selesai Kerja di Rumah", "2025-12-02 17:05:00", FAR_AWAY),
+    ("Mulai Kerja di Rumah", "2025-12-02 08:00:00", FAR_AWAY),
+    ("Absensi Pulang", "2025-12-01 17:05:00", FAR_AWAY),
+    ("Absensi Masuk", "2025-12-01 08:00:00", FAR_AWAY),
+]
+
+
+def test_work_from_home_scans_skip_the_fence():
+    index = build_site_index([HQ])
+
+    result = _calculate_valid_invalid_working_days({"A": HOME_AND_OFFICE_DAYS}, detail=False, site_index=index)
+
+    assert result == {"valid_working_days": {"A": 0.5}, "invalid_working_days": {"A": -1.0}}
+
+
+def test_daily_rollup_applies_the_fence():
+    rollup = build_daily_rollup({"A": HOME_AND_OFFICE_DAYS}, build_site_index([HQ]))
+
+    assert rollup["A"]["2025-12-01"]["invalid_working_days"] == -1.0
+    assert rollup["A"]["2025-12-02"]["valid_working_days"] == 0.5
@@ -0,0 +1,135 @@
+import csv
+import json
+
+import pytest
+
+from src.calculate_all import _calculate_all, calculate_all_from_file
+from src.data_processing.calculate_meals_count import MEAL_TYPES, _calculate_meals_count, calculate_meals_count_from_file
+from src.data_processing.calculate_overtime_pay_remaining_debit import (
+    calculate_overtime_pay_and_remaining_debit_from_file,
+)
+from src.data_processing.calculate_valid_invalid_working_days import (
+    ATTENDANCE_TYPES,
+    _calculate_valid_invalid_working_days,
+    calculate_valid_invalid_working_days_from_file,
+)
+from src.filter_report import combine_branches, filter_by_type
+from src.policy_sweep import sweep_policies
+
+DAY_SCANS = [
+    ("Absensi Masuk", "08:05:00"),
+    ("C IN", "08:50:00"),
+    ("Mulai Istirahat", "12:00:00"),
+    ("Selesai Istirahat", "12:45:00"),
+    ("C OUT", "16:30:00"),
+    ("Absensi Pulang", "16:40:00"),
+    ("Mulai Lembur", "17:10:00"),
+    ("Selesai Lembur", "21:30:00"),
+]
+
+
+def _records(employee_offset: int, days: range):
+    """Return (Tipe Absensi, Tanggal Absensi) records in ascending time, unlike the newest-first export."""
+    records = []
+    for day in days:
+        for position, (tipe_absensi, clock) in enumerate(DAY_SCANS):
+            if (day + position + employee_offset) % 5 == 0:
+                continue
+            hour, minute, second = clock.split(":")
+            minute = f"{(int(minute) + 7 * employee_offset) % 60:02d}"
+            records.append((tipe_absensi, f"2025-12-{day:02d} {hour}:{minute}:{second}"))
+    return records
+
+
+def _mapping():
+    return {f"Emp{offset}": _records(offset, range(1, 21)) for offset in range(3)}
+
+
+def _standalone_summary(path):
+    pay = json.loads(calculate_overtime_pay_and_remaining_debit_from_file(path))
+    working_days = json.loads(calculate_valid_invalid_working_days_from_file(path, detail=False))
+    meals = json.loads(calculate_meals_count_from_file(path, detail=False))
+    return {
+        employee: {
+            "valid_working_days": working_days["valid_working_days"].get(employee, 0.0),
+            "invalid_working_days": working_days["invalid_working_days"].get(employee, 0.0),
+            "overtime_to_be_paid_in_rupiah": pay["overtime_to_be_paid_in_rupiah"].get(employee, 0.0),
+            "remaining_debit_hours": pay["remaining_debit_hours"].get(employee, 0.0),
+            "meals_count": meals["total_meal_count"].get(employee, 0),
+        }
+        for employee in working_days["valid_working_days"]
+    }
+
+
+def _write_export(path, mapping):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["No", "Nama Karyawan", "Tanggal Absensi", "Tipe Absensi"])
+        rows = [(employee, tanggal, tipe) for employee, records in mapping.items() for tipe, tanggal in records]
+        for number, row in enumerate(rows, start=1):
+            writer.writerow([number, *row])
+
+
+@pytest.mark.parametrize("newest_first", [False, True])
+def test_standalone_calculators_match_calculate_all(tmp_path, newest_first):
+    mapping = _mapping()
+    if newest_first:
+        mapping = {employee: records[::-1] for employee, records in mapping.items()}
+    path = tmp_path / "report.csv"
+    _write_export(path, mapping)
+
+    combined = json.loads(calculate_all_from_file(str(path)))
+    standalone = _standalone_summary(str(path))
+
+    assert combined.keys() == standalone.keys()
+    for employee, values in standalone.items():
+        assert combined[employee] == pytest.approx(values)
+
+
+def test_results_do_not_depend_on_record_order():
+    ascending = _mapping()
+    descending = {employee: records[::-1] for employee, records in ascending.items()}
+
+    summary, _ = _calculate_all(ascending)
+    reversed_summary, _ = _calculate_all(descending)
+    assert summary.keys() == reversed_summary.keys()
+    for employee, values in summary.items():
+        assert reversed_summary[employee] == pytest.approx(values)
+    assert _calculate_meals_count(filter_by_type(ascending, MEAL_TYPES))[0] == _calculate_meals_count(
+        filter_by_type(descending, MEAL_TYPES)
+    )[0]
+
+
+def test_overlapping_branches_agree_across_entry_points():
+    # The same employee scanning on the same days in two sheets leaves the
+    # merged records out of time order.
+    branches = {
+        "Jakarta": {"Emp0": _records(0, range(1, 15))[::-1]},
+        "Bandung": {"Emp0": _records(1, range(10, 21))[::-1]},
+    }
+    mapping = combine_branches(branches)
+
+    summary, _ = _calculate_all(mapping)
+    meals_count, _, _ = _calculate_meals_count(filter_by_type(mapping, MEAL_TYPES))
+    working_days = _calculate_valid_invalid_working_days(filter_by_type(mapping, ATTENDANCE_TYPES), detail=False)
+    swept = sweep_policies(mapping)[0]["summary"]
+
+    assert summary["Emp0"]["meals_count"] == meals_count["Emp0"]
+    assert summary["Emp0"]["valid_working_days"] == pytest.approx(working_days["valid_working_days"]["Emp0"])
+    assert summary["Emp0"]["invalid_working_days"] == pytest.approx(working_days["invalid_working_days"]["Emp0"])
+    assert swept["Emp0"] == pytest.approx(summary["Emp0"])
+
+
+def test_sweep_grid_matches_single_policy_sweeps():
+    mapping = _mapping()
+    grace_periods, tolerances = (0.5, 0.1, 0.5, 0.0), (0.6, 0.2)
+
+    grid = sweep_policies(mapping, grace_periods, tolerances)
+
+    assert [result["scenario"]["late_grace_period"] for result in grid[::2]] == list(grace_periods)
+    for result in grid:
+        scenario = result["scenario"]
+        (single,) = sweep_policies(mapping, [scenario["late_grace_period"]], [scenario["max_validity_tolerance"]])
+        assert single["scenario"] == scenario
+        for employee, values in single["summary"].items():
+            assert result["summary"][employee] == pytest.approx(values)
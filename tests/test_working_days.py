@@ -0,0 +1,40 @@
+import pytest
+
+from src.data_processing.calculate_valid_invalid_working_days import _calculate_valid_invalid_working_days
+
+# Expected values are those of the original file-order calculator on the
+# export's newest-first rows.
+MIXED_CHECK_IN = [
+    ("Absensi Masuk", "2025-12-01 07:55:00"),
+    ("Mulai Kerja di Rumah", "2025-12-01 07:50:00"),
+]
+MIXED_DAY = [
+    ("Absensi Pulang", "2025-12-01 17:55:00"),
+    ("Selesai Kerja di Rumah", "2025-12-01 17:50:00"),
+    ("Absensi Masuk", "2025-12-01 10:55:00"),
+    ("Mulai Kerja di Rumah", "2025-12-01 07:50:00"),
+    ("Absensi Masuk", "2025-12-01 07:40:00"),
+]
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_mixed_home_and_office_check_in_matches_baseline(newest_first):
+    records = MIXED_CHECK_IN if newest_first else MIXED_CHECK_IN[::-1]
+
+    result = _calculate_valid_invalid_working_days({"A": records}, detail=False)
+
+    assert result == {"valid_working_days": {"A": 0.25}, "invalid_working_days": {"A": 0.0}}
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_mixed_day_breakdown_matches_baseline(newest_first):
+    records = MIXED_DAY if newest_first else MIXED_DAY[::-1]
+
+    result = _calculate_valid_invalid_working_days({"A": records})
+
+    assert result["valid_days_breakdown"]["A"] == [
+        {"date": "2025-12-01", "valid_check_in_count": 0.5, "valid_check_out_count": 0.25}
+    ]
+    assert result["invalid_days_breakdown"]["A"] == [
+        {"date": "2025-12-01", "invalid_check_in_count": -0.5, "invalid_check_out_count": 0.0}
+    ]